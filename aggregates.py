@@ -0,0 +1,106 @@
+from collections import Counter
+from mongo_sink import BulkWriter
+from parallel import batched
+from watermarks import id_range
+
+# Running per-entity aggregates kept by the insight builders between runs.
+# Each club/player has one document in club_aggregates/player_aggregates holding
+# sums and counters; new documents are folded in and the cheap normalization is
+# re-run over the totals, so nothing already counted has to be rescored.
+# Source documents are read through projected cursors CURSOR_BATCH_SIZE at a time, so
+# only the aggregates (not the corpus) are held in memory.
+
+CURSOR_BATCH_SIZE = 1000
+
+# Empty running news aggregate for one club or player
+def new_news_stats():
+    return {
+        "sentiment_sum": 0.0,
+        "num_articles": 0,
+        "strong_positive_sentences": [],
+        "strong_negative_sentences": [],
+        "positive_keyword_counts": {},
+        "negative_keyword_counts": {}
+    }
+
+# Add a mapping of counts into a stored keyword-count dict
+def add_counts(target, counts):
+    for key, value in counts.items():
+        target[key] = target.get(key, 0) + value
+
+# Load every stored aggregate keyed by entity name
+def load_aggregates(col, key):
+    return {doc[key]: doc for doc in col.find({}, {"_id": 0})}
+
+# Write back the aggregates of the given entities in bulk
+def save_aggregates(col, key, aggregates, names):
+    with BulkWriter(col) as writer:
+        for name in names:
+            writer.update_one({key: name}, {"$set": aggregates[name]}, upsert=True)
+
+# (entity type, entity name) of a news_data document
+def news_entity(doc):
+    if doc.get("player"):
+        return "player", doc["player"]
+    return "club", doc.get("club")
+
+# Fold the preprocessed articles of the news_data documents in (after, upto] into per-entity
+# aggregates. Articles are shared between entities, so each one is summarized once per batch
+# of news_data documents and then added to every club/player that references it.
+# `lexicon` is a Lexicon with "positive" and "negative" keywords.
+def fold_news(db, aggregates, entity_type, after, upto, lexicon, new_record, batch_size=CURSOR_BATCH_SIZE):
+    touched = set()
+    projection = {"club": 1, "player": 1, "article_ids": 1}
+    cursor = db["news_data"].find(id_range(after, upto), projection).sort("_id", 1).batch_size(batch_size)
+    for batch in batched(cursor, batch_size):
+        references = []
+        for doc in batch:
+            doc_type, entity = news_entity(doc)
+            if doc_type == entity_type:
+                references.append((entity, doc.get("article_ids", [])))
+        summaries = summarize_articles(db, {article_id for _, ids in references for article_id in ids},
+                                       lexicon, batch_size)
+
+        for entity, ids in references:
+            # Articles without text have no summary and are not counted
+            scored = [summaries[article_id] for article_id in ids if article_id in summaries]
+            if not scored:
+                continue
+            stats = aggregates.setdefault(entity, new_record(entity))["news"]
+            for summary in scored:
+                stats["sentiment_sum"] += summary["polarity"]
+                stats["num_articles"] += 1
+                stats["strong_positive_sentences"] += summary["strong_positive_sentences"]
+                stats["strong_negative_sentences"] += summary["strong_negative_sentences"]
+                add_counts(stats["positive_keyword_counts"], summary["positive_keyword_counts"])
+                add_counts(stats["negative_keyword_counts"], summary["negative_keyword_counts"])
+            touched.add(entity)
+
+    return touched
+
+# Per-article polarity, strong sentences and keyword counts of preprocessed articles
+def summarize_articles(db, article_ids, lexicon, batch_size=CURSOR_BATCH_SIZE):
+    if not article_ids:
+        return {}
+    article_filter = {"source": "articles", "source_id": {"$in": list(article_ids)}}
+    summaries = {doc["source_id"]: {
+        "polarity": doc["polarity"],
+        "strong_positive_sentences": [],
+        "strong_negative_sentences": [],
+        "positive_keyword_counts": Counter(),
+        "negative_keyword_counts": Counter()
+    } for doc in db["documents"].find(article_filter, {"source_id": 1, "polarity": 1}).batch_size(batch_size)}
+
+    sentences = db["sentences"].find(article_filter, {"source_id": 1, "text": 1, "tokens": 1, "polarity": 1}).sort(
+        [("source_id", 1), ("offset", 1)]).batch_size(batch_size)
+    for sent in sentences:
+        summary = summaries[sent["source_id"]]
+        p = sent["polarity"]
+        if p > 0.6:
+            summary["strong_positive_sentences"].append(sent["text"])
+        elif p < -0.6:
+            summary["strong_negative_sentences"].append(sent["text"])
+        counts = lexicon.count(sent["tokens"])
+        summary["positive_keyword_counts"].update(counts["positive"])
+        summary["negative_keyword_counts"].update(counts["negative"])
+    return summaries
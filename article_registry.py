@@ -0,0 +1,160 @@
+from pymongo import MongoClient
+from bson import ObjectId
+from collections import defaultdict
+import hashlib
+from itertools import islice
+import re
+from sentiment_cache import normalize_text
+from mongo_sink import BulkWriter
+from watermarks import STATE_COLLECTION
+
+# Registry of unique news articles.
+# Every scraped article is fingerprinted at ingest: an exact hash of its normalized text and
+# a 64-bit SimHash over word shingles. An article whose hash is known, or whose SimHash is
+# within NEAR_DUPLICATE_BITS of a stored one (the same wire story, lightly edited), resolves
+# to the stored article; otherwise it is added to the `articles` collection. news_data
+# documents only hold `article_ids`, so each story is stored, split and scored once no
+# matter how many clubs or players it turns up under.
+
+ARTICLES_COLLECTION = "articles"
+
+SHINGLE_SIZE = 3
+NEAR_DUPLICATE_BITS = 3
+# The 64-bit SimHash is split into BANDS bands; two hashes within NEAR_DUPLICATE_BITS bits
+# of each other share at least one band exactly (pigeonhole), so bands index the candidates
+BANDS = 4
+BAND_BITS = 64 // BANDS
+
+# Exact fingerprint: SHA-256 of the lowercased, normalized text
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).lower().encode("utf-8")).hexdigest()
+
+# 64-bit SimHash of the text's word shingles
+def simhash(text):
+    words = re.findall(r"\w+", normalize_text(text).lower())
+    shingles = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))]
+    weights = [0] * 64
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+# Band keys of a SimHash, e.g. ["0:1a2b", "1:...", ...]
+def simhash_bands(value):
+    mask = (1 << BAND_BITS) - 1
+    return [f"{i}:{value >> (i * BAND_BITS) & mask:04x}" for i in range(BANDS)]
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+class ArticleRegistry:
+    # `writer` is the articles collection or a BulkWriter on it
+    def __init__(self, db, writer=None):
+        self.writer = writer or db[ARTICLES_COLLECTION]
+        self.by_hash = {}
+        self.by_band = defaultdict(list)
+        self.new = self.exact = self.near = 0
+        for doc in db[ARTICLES_COLLECTION].find({}, {"hash": 1, "simhash": 1}):
+            self.index(doc["_id"], doc["hash"], int(doc["simhash"], 16))
+
+    def index(self, article_id, hash_value, sim):
+        self.by_hash[hash_value] = article_id
+        for band in simhash_bands(sim):
+            self.by_band[band].append((article_id, sim))
+
+    # Stored article within NEAR_DUPLICATE_BITS of a SimHash, or None
+    def near_duplicate(self, sim):
+        for band in simhash_bands(sim):
+            for article_id, other in self.by_band.get(band, ()):
+                if hamming(sim, other) <= NEAR_DUPLICATE_BITS:
+                    return article_id
+        return None
+
+    # Id of the stored article (title, text, url, source, date), adding it if it is new
+    def register(self, article):
+        hash_value = text_hash(article["text"])
+        if hash_value in self.by_hash:
+            self.exact += 1
+            return self.by_hash[hash_value]
+
+        sim = simhash(article["text"])
+        article_id = self.near_duplicate(sim)
+        if article_id is not None:
+            self.near += 1
+            self.by_hash[hash_value] = article_id
+            return article_id
+
+        article_id = ObjectId()
+        self.writer.insert_one({
+            "_id": article_id,
+            "hash": hash_value,
+            "simhash": f"{sim:016x}",
+            "simhash_bands": simhash_bands(sim),
+            **article
+        })
+        self.index(article_id, hash_value, sim)
+        self.new += 1
+        return article_id
+
+    # Ids of a list of articles, each story once, in first-seen order
+    def register_all(self, articles):
+        ids = []
+        for article in articles:
+            article_id = self.register(article)
+            if article_id not in ids:
+                ids.append(article_id)
+        return ids
+
+    # Write queued articles now (before anything that references them is written)
+    def flush(self):
+        if isinstance(self.writer, BulkWriter):
+            self.writer.flush()
+
+    def report(self):
+        return f" Articles: {self.new} new, {self.exact} exact and {self.near} near duplicates"
+
+# Move the embedded `articles` arrays of news_data into the registry.
+# Pass 1 registers the articles and sets article_ids but keeps the embedded arrays; pass 2
+# only removes an array once every article it references is confirmed in the articles
+# collection, so a write error or a crash never loses an article and the migration can
+# simply be re-run (registering the same articles again finds them as exact duplicates).
+def migrate(db):
+    count = 0
+    with BulkWriter(db["news_data"]) as news_writer, BulkWriter(db[ARTICLES_COLLECTION]) as articles_writer:
+        registry = ArticleRegistry(db, articles_writer)
+        for doc in db["news_data"].find({"articles": {"$exists": True}}, {"articles": 1}):
+            article_ids = registry.register_all([a for a in doc["articles"] if a.get("text")])
+            news_writer.update_one({"_id": doc["_id"]}, {
+                "$set": {"article_ids": article_ids, "articles_count": len(article_ids)}
+            })
+            count += 1
+        registry.flush()
+    print(registry.report())
+
+    cleared = kept = 0
+    with BulkWriter(db["news_data"]) as news_writer:
+        cursor = db["news_data"].find({"articles": {"$exists": True}}, {"article_ids": 1})
+        while batch := list(islice(cursor, 500)):
+            wanted = list({article_id for doc in batch for article_id in doc.get("article_ids") or []})
+            stored = {a["_id"] for a in db[ARTICLES_COLLECTION].find({"_id": {"$in": wanted}}, {"_id": 1})}
+            for doc in batch:
+                if "article_ids" in doc and all(article_id in stored for article_id in doc["article_ids"]):
+                    news_writer.update_one({"_id": doc["_id"]}, {"$unset": {"articles": ""}})
+                    cleared += 1
+                else:
+                    kept += 1
+
+    # Sentences split from the embedded copies are superseded by the registry's articles
+    db["documents"].delete_many({"source": "news_data"})
+    db["sentences"].delete_many({"source": "news_data"})
+    db[STATE_COLLECTION].delete_many({"source": "news_data", "stage": "preprocess"})
+    print(f" Migrated {cleared} of {count} news_data documents"
+          + (f"; {kept} keep embedded articles that are not stored (re-run the migration)" if kept else "")
+          + "; rebuild the insights without --incremental")
+
+if __name__ == "__main__":
+    # MongoDB connection setup
+    client = MongoClient("uri")  # Replace with your actual MongoDB URI
+    db = client["media_impact_db"]
+    migrate(db)
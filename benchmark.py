@@ -0,0 +1,419 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta
+from pymongo import MongoClient, monitoring
+from bson import ObjectId
+import nltk
+from mongo_sink import BulkWriter
+from article_registry import ARTICLES_COLLECTION, text_hash
+from sentiment_cache import SentimentCache
+from aggregates import CURSOR_BATCH_SIZE
+from watermarks import latest_id, content_hash
+import db_indexes
+import preprocess
+import club_insights
+import player_insights
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Benchmark of the insights pipeline on a synthetic corpus.
+# A seeded generator fills a scratch database with clubs, squads, news articles, tweets
+# and transcripts at a chosen scale; the preprocessing stage and both insight builders
+# then run against it (a full build, followed by an incremental run over a small batch
+# of new documents). As in a scheduled run, texts are split once: the preprocess stages do
+# the splitting the first builder would otherwise do, and each builder's own preprocessing
+# call finds nothing left (its texts_split stays 0 unless a builder splits texts again). Per stage it reports wall time, sentences/second, peak memory (the
+# process RSS sampled while the stage runs) and MongoDB round trips as JSON, so the numbers
+# of two commits can be compared directly. The Python heap peak from tracemalloc is opt-in
+# (--trace-memory): tracing every allocation slows the stages down too much to time them.
+
+# Corpus sizes: clubs, players, articles per club/player, tweets per club, videos
+SCALES = {
+    "small": {"clubs": 20, "players": 500, "articles": 2, "tweets": 20, "videos": 100},
+    "medium": {"clubs": 50, "players": 2000, "articles": 2, "tweets": 20, "videos": 400},
+    "large": {"clubs": 200, "players": 10000, "articles": 2, "tweets": 20, "videos": 2000},
+}
+
+# Sentences per article, tweet and transcript
+ARTICLE_SENTENCES = 8
+TWEET_SENTENCES = 1
+TRANSCRIPT_SENTENCES = 40
+
+# Share of the full corpus added before the incremental runs
+DELTA = 0.05
+
+DEFAULT_DB = "media_impact_bench"
+
+FIRST_NAMES = [
+    "James", "Luca", "Mateo", "Kai", "Noah", "Ethan", "Leon", "Hugo", "Rúben", "João",
+    "Martin", "Kevin", "Bruno", "Declan", "Bukayo", "Heung-min", "Virgil", "Mohamed", "Erling", "Son",
+    "Pierre", "Emile", "Sergio", "Diogo", "Ángel", "Thiago", "Kaoru", "Youri", "Nicolás", "Jarrod",
+]
+SURNAME_SYLLABLES = ["ar", "be", "ca", "do", "el", "fa", "gu", "ha", "io", "jo",
+                     "ka", "lo", "ma", "ni", "ø", "pe", "ri", "sa", "tø", "vi"]
+CLUB_SUFFIXES = ["FC", "United", "City", "Athletic", "Rovers", "Wanderers", "Town", "Albion"]
+
+NEUTRAL_WORDS = [
+    "the", "a", "match", "team", "season", "coach", "fans", "first", "half", "second",
+    "minute", "league", "table", "week", "after", "before", "against", "with", "home", "away",
+    "training", "squad", "stadium", "result", "points", "game", "side", "played", "said", "today",
+]
+POLARITY_WORDS = ["great", "excellent", "good", "happy", "terrible", "awful", "bad", "sad", "superb", "weak"]
+KEYWORDS = sorted(club_insights.news_positive | club_insights.news_negative | club_insights.yt_positive
+                  | club_insights.yt_negative | player_insights.positive_keywords | player_insights.negative_keywords)
+
+# Deterministic synthetic corpus: the same seed and scale always give the same documents
+class CorpusGenerator:
+    def __init__(self, clubs, players, seed=0):
+        self.rng = random.Random(seed)
+        self.clubs = self.club_names(clubs)
+        self.squads = {club: [] for club in self.clubs}
+        for i, name in enumerate(self.player_names(players)):
+            self.squads[self.clubs[i % len(self.clubs)]].append(name)
+        self.players = [name for squad in self.squads.values() for name in squad]
+        self.clock = datetime(2025, 1, 1)
+        self.article_count = self.video_count = 0
+
+    def club_names(self, count):
+        names = []
+        while len(names) < count:
+            stem = "".join(self.rng.choice(SURNAME_SYLLABLES) for _ in range(3)).capitalize()
+            name = f"{stem} {self.rng.choice(CLUB_SUFFIXES)}"
+            if name not in names:
+                names.append(name)
+        return names
+
+    def player_names(self, count):
+        names = set()
+        ordered = []
+        while len(ordered) < count:
+            surname = "".join(self.rng.choice(SURNAME_SYLLABLES) for _ in range(self.rng.randint(2, 4)))
+            name = f"{self.rng.choice(FIRST_NAMES)} {surname.capitalize()}"
+            if name not in names:
+                names.add(name)
+                ordered.append(name)
+        return ordered
+
+    # One sentence of filler, sentiment words and lexicon keywords around the given names
+    def sentence(self, names):
+        words = self.rng.choices(NEUTRAL_WORDS, k=self.rng.randint(5, 10))
+        words += self.rng.choices(KEYWORDS, k=self.rng.randint(0, 2))
+        words += self.rng.choices(POLARITY_WORDS, k=self.rng.randint(0, 2))
+        self.rng.shuffle(words)
+        for name in names:
+            words.insert(self.rng.randint(0, len(words)), name)
+        text = " ".join(words)
+        return text[0].upper() + text[1:] + self.rng.choice([".", ".", ".", "!", "?"])
+
+    def text(self, names, sentences):
+        return " ".join(self.sentence(self.rng.sample(names, min(len(names), self.rng.randint(0, 2))))
+                        for _ in range(sentences))
+
+    def timestamp(self):
+        self.clock += timedelta(minutes=self.rng.randint(1, 90))
+        return self.clock.strftime("%Y-%m-%d %H:%M:%S")
+
+    # Clubs and their squads
+    def add_entities(self, db):
+        with BulkWriter(db["clubs"], verbose=False) as clubs_writer, \
+                BulkWriter(db["players"], verbose=False) as players_writer:
+            for club in self.clubs:
+                clubs_writer.insert_one({"club_name": club, "squad_url": "", "logo_ref": None,
+                                         "logo_variant_refs": None})
+                for name in self.squads[club]:
+                    players_writer.insert_one({
+                        "name": name, "club_name": club, "position": self.rng.choice(["Goalkeeper", "Defender",
+                                                                                       "Midfield", "Attack"]),
+                        "age": str(self.rng.randint(17, 36)), "market_value": f"€{self.rng.randint(1, 90)}m",
+                        "photo_ref": None, "photo_variant_refs": None
+                    })
+
+    # News (club articles are shared with two squad players), tweets and videos.
+    # `fraction` scales the per-entity counts, for the batch added before incremental runs.
+    def add_content(self, db, articles, tweets, videos, fraction=1.0):
+        references = []  # (entity key, entity name, [article ids])
+        article_docs = []
+
+        def article(names):
+            self.article_count += 1
+            text = self.text(names, ARTICLE_SENTENCES)
+            doc = {"_id": ObjectId(), "hash": text_hash(text), "title": self.sentence(names[:1]),
+                   "text": text, "url": f"https://news.example/{self.article_count}",
+                   "source": "Example News", "date": self.timestamp()}
+            article_docs.append(doc)
+            return doc["_id"]
+
+        shared = {}
+        for club in self.rng.sample(self.clubs, max(1, round(len(self.clubs) * fraction))):
+            squad = self.squads[club]
+            ids = [article([club] + self.rng.sample(squad, min(2, len(squad)))) for _ in range(articles)]
+            references.append(("club", club, ids))
+            for name in squad[:2]:
+                shared.setdefault(name, []).extend(ids[:1])
+        for name in self.rng.sample(self.players, max(1, round(len(self.players) * fraction))):
+            ids = shared.get(name, []) + [article([name]) for _ in range(articles)]
+            references.append(("player", name, ids))
+
+        # Articles are written before the news_data documents that reference them
+        with BulkWriter(db[ARTICLES_COLLECTION], verbose=False) as articles_writer:
+            for doc in article_docs:
+                articles_writer.insert_one(doc)
+        with BulkWriter(db["news_data"], verbose=False) as news_writer:
+            for key, name, ids in references:
+                news_writer.insert_one({key: name, "source": "news", "articles_count": len(ids), "article_ids": ids})
+
+        with BulkWriter(db["twitter_data"], verbose=False) as twitter_writer:
+            for club in self.rng.sample(self.clubs, max(1, round(len(self.clubs) * fraction))):
+                mentions = [{"content": self.text([club], TWEET_SENTENCES), "created_at": self.timestamp(),
+                             "author_id": self.rng.randint(1, 10 ** 9)} for _ in range(tweets)]
+                twitter_writer.insert_one({"entity": club, "source": "twitter", "mention_count": len(mentions),
+                                           "collected_at": self.timestamp(), "mentions_data": mentions})
+
+        with BulkWriter(db["youtube_data"], verbose=False) as youtube_writer:
+            for _ in range(max(1, round(videos * fraction))):
+                self.video_count += 1
+                club = self.rng.choice(self.clubs)
+                cast = [club, self.rng.choice(self.clubs)] + self.rng.sample(self.players, min(6, len(self.players)))
+                transcript = self.text(cast, TRANSCRIPT_SENTENCES)
+                youtube_writer.insert_one({
+                    "video_id": f"bench{self.video_count:07d}",
+                    "title": f"{' '.join(self.rng.sample(cast, 2))} | Highlights",
+                    "video_url": f"https://www.youtube.com/watch?v=bench{self.video_count:07d}",
+                    "transcript_text": transcript,
+                    "transcript_hash": content_hash(transcript)
+                })
+        return len(article_docs)
+
+# Counts the commands sent to the server, by command name
+class RoundTripCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = Counter()
+
+    def started(self, event):
+        self.commands[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+# Seconds between RSS samples while a stage runs
+RSS_SAMPLE_INTERVAL = 0.05
+
+# Current resident set size of the process in MB (Linux only; None elsewhere)
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+
+# Samples the RSS in a background thread and keeps the peak seen between start and stop
+class RssSampler(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.stopped = threading.Event()
+        self.start_mb = self.peak_mb = current_rss_mb()
+
+    def run(self):
+        while not self.stopped.wait(RSS_SAMPLE_INTERVAL):
+            self.sample()
+
+    def sample(self):
+        rss = current_rss_mb()
+        if rss is not None:
+            self.peak_mb = max(self.peak_mb or 0.0, rss)
+
+    def __enter__(self):
+        if self.start_mb is not None:
+            self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.start_mb is not None:
+            self.stopped.set()
+            self.join()
+            self.sample()
+        return False
+
+# Peak resident set size over the whole life of the process, in MB (None where unavailable).
+# It never goes down, so it only says which stage so far used the most memory.
+def lifetime_max_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+class Benchmark:
+    def __init__(self, db, listener=None, trace_memory=False):
+        self.db = db
+        self.listener = listener
+        self.trace_memory = trace_memory
+        self.stages = {}
+
+    # Run one stage and record its timings; the pipeline's own output goes to stderr
+    def stage(self, name, func, sentences=None):
+        sentences_before = self.db["sentences"].estimated_document_count()
+        documents_before = latest_id(self.db["documents"])
+        before = Counter(self.listener.commands) if self.listener else None
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            heap_start = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        with RssSampler() as rss, contextlib.redirect_stdout(sys.stderr):
+            func()
+        seconds = time.perf_counter() - start
+        heap_peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+        commands = self.listener.commands - before if self.listener else None
+
+        # Sentences the stage worked on: the ones it created, or the given count it read
+        if sentences is None:
+            sentences = self.db["sentences"].estimated_document_count() - sentences_before
+        split_filter = {"_id": {"$gt": documents_before}} if documents_before else {}
+        result = {
+            "seconds": round(seconds, 3),
+            "sentences": sentences,
+            "sentences_per_sec": round(sentences / seconds, 1) if seconds and sentences else None,
+            # Articles/transcripts split (or re-split) during the stage
+            "texts_split": self.db["documents"].count_documents(split_filter),
+            # Memory of this stage: Python heap peak (and its growth over the heap the stage
+            # started with), and the RSS before the stage and at its sampled peak
+            "python_peak_mb": round(heap_peak / 2 ** 20, 1) if self.trace_memory else None,
+            "python_growth_mb": round((heap_peak - heap_start) / 2 ** 20, 1) if self.trace_memory else None,
+            "rss_start_mb": rss.start_mb,
+            "rss_peak_mb": rss.peak_mb,
+            "rss_growth_mb": round(rss.peak_mb - rss.start_mb, 1) if rss.start_mb is not None else None,
+            "lifetime_max_rss_mb": lifetime_max_rss_mb(),
+            "round_trips": None,
+        }
+        if commands is not None:
+            result["round_trips"] = {"total": sum(commands.values()), **dict(sorted(commands.items()))}
+        self.stages[name] = result
+        print(f" {name}: {seconds:.2f}s", file=sys.stderr)
+        return result
+
+def run(db, scale, seed=0, workers=1, batch_size=CURSOR_BATCH_SIZE, listener=None, trace_memory=False):
+    generator = CorpusGenerator(scale["clubs"], scale["players"], seed)
+    bench = Benchmark(db, listener, trace_memory)
+    if trace_memory:
+        tracemalloc.start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A fresh sentiment cache, so every run scores the same texts from scratch
+        cache = SentimentCache(os.path.join(tmp, "sentiment_cache.sqlite"))
+
+        def generate():
+            db_indexes.ensure_indexes(db)
+            generator.add_entities(db)
+            generator.add_content(db, scale["articles"], scale["tweets"], scale["videos"])
+
+        def generate_delta():
+            generator.add_content(db, scale["articles"], scale["tweets"], scale["videos"], fraction=DELTA)
+
+        def build(incremental):
+            return {
+                "club_insights": lambda: club_insights.run(db, cache, incremental=incremental,
+                                                           batch_size=batch_size),
+                "player_insights": lambda: player_insights.run(db, cache, incremental=incremental, workers=workers,
+                                                               batch_size=batch_size),
+            }
+
+        bench.stage("generate", generate, sentences=0)
+        bench.stage("preprocess", lambda: preprocess.run(db, cache))
+        total = db["sentences"].count_documents({})
+        for name, func in build(incremental=False).items():
+            bench.stage(name, func, sentences=total)
+
+        bench.stage("generate_delta", generate_delta, sentences=0)
+        bench.stage("preprocess_delta", lambda: preprocess.run(db, cache))
+        delta = db["sentences"].count_documents({}) - total
+        for name, func in build(incremental=True).items():
+            bench.stage(f"{name}_incremental", func, sentences=delta)
+        cache.close()
+
+    if trace_memory:
+        tracemalloc.stop()
+    return {
+        "corpus": {name: db[name].estimated_document_count()
+                   for name in ["clubs", "players", ARTICLES_COLLECTION, "news_data", "twitter_data",
+                                "youtube_data", "sentences"]},
+        "stages": bench.stages,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the insights pipeline on a synthetic corpus")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="corpus size preset")
+    for field in ["clubs", "players", "articles", "tweets", "videos"]:
+        parser.add_argument(f"--{field}", type=int, help=f"override the preset's number of {field}")
+    parser.add_argument("--seed", type=int, default=0, help="generator seed (same seed, same corpus)")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017", help="local mongod to benchmark against")
+    parser.add_argument("--db", default=DEFAULT_DB, help="scratch database (dropped before and after the run)")
+    parser.add_argument("--mongomock", action="store_true",
+                        help="run against an in-memory mongomock database (no round trip counts)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for player_insights.py")
+    parser.add_argument("--batch-size", type=int, default=CURSOR_BATCH_SIZE, help="cursor batch size of the builders")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also record the per-stage Python heap peak (tracemalloc slows every stage "
+                             "down several times, so timings of such a run are not comparable)")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    scale = dict(SCALES[args.scale])
+    scale.update({field: getattr(args, field) for field in scale if getattr(args, field) is not None})
+
+    with contextlib.redirect_stdout(sys.stderr):
+        nltk.download("punkt")
+
+    listener = None
+    if args.mongomock:
+        import mongomock
+        client = mongomock.MongoClient()
+    else:
+        listener = RoundTripCounter()
+        client = MongoClient(args.mongo_uri, event_listeners=[listener])
+    client.drop_database(args.db)
+    try:
+        results = run(client[args.db], scale, args.seed, args.workers, args.batch_size, listener, args.trace_memory)
+    finally:
+        client.drop_database(args.db)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "backend": "mongomock" if args.mongomock else "mongod",
+        "trace_memory": args.trace_memory,
+        "scale": {"preset": args.scale, "seed": args.seed, "workers": args.workers,
+                  "batch_size": args.batch_size, **scale},
+        **results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f" Report written to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=1))
@@ -1,23 +1,21 @@
 from pymongo import MongoClient
-from textblob import TextBlob
 import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-from collections import Counter
-from sklearn.preprocessing import MinMaxScaler
+import argparse
+import json
+from itertools import groupby
 import unicodedata
+from name_index import NameIndex, ALIASES_PATH, load_aliases, name_tokens
+from lexicon import Lexicon
+from sentiment_cache import SentimentCache
+import preprocess
+import impact_scoring
+from aggregates import new_news_stats, add_counts, load_aggregates, save_aggregates, fold_news, CURSOR_BATCH_SIZE
+from parallel import batched
+from watermarks import get_watermark, set_watermark, reset_watermarks, latest_id, id_range
+from mongo_sink import BulkWriter
 
-# Download NLTK resources
-nltk.download("punkt")
-
-# MongoDB connection
-client = MongoClient("uri")  # Replace with your actual MongoDB URI
-db = client["media_impact_db"]
-clubs_col = db["clubs"]
-tweets_col = db["twitter_data"]
-news_col = db["news_data"]
-players_col = db["players"]
-videos_col = db["youtube_data"]
-insights_col = db["club_insights"]
+# Name of this stage in the pipeline_state watermarks
+STAGE = "club_insights"
 
 # Safe print to handle Unicode
 def safe_print(text):
@@ -26,11 +24,6 @@ def safe_print(text):
     except UnicodeEncodeError:
         print(unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii"))
 
-# Function to normalize lists into a range (default: 1 to 10)
-def normalize_list(data, feature_range=(1, 10)):
-    scaler = MinMaxScaler(feature_range=feature_range)
-    return scaler.fit_transform([[x] for x in data])
-
 # Define keyword dictionaries
 news_positive = {"victory", "win", "wins", "dominated", "undefeated", "clean sheet", "scored",
     "comeback", "tactical", "resilient", "disciplined", "title contenders", "champions",
@@ -52,161 +45,272 @@ yt_negative = {"miss", "missed chance", "penalty miss", "red card", "yellow card
     "controversial", "poor clearance", "bad tackle", "blunder", "slip", "mistake",
     "blocked", "slow reaction", "disallowed goal"}
 
-# Prepare reference mappings
-clubs = list(clubs_col.find())
-club_names = [club["club_name"].lower() for club in clubs]
-club_lookup = {club["club_name"].lower(): club["club_name"] for club in clubs}
-players = list(players_col.find())
-player_to_club = {p["name"].lower(): p["club_name"] for p in players}
-player_names = set(player_to_club.keys())
+# Each pair compiled once into a matcher that counts single- and multi-word keywords
+news_lexicon = Lexicon({"positive": news_positive, "negative": news_negative})
+yt_lexicon = Lexicon({"positive": yt_positive, "negative": yt_negative})
+
+# Empty running aggregate for one club
+def new_club_record(club_name):
+    return {
+        "club_name": club_name,
+        "news": new_news_stats(),
+        "twitter": {"sentiment_sum": 0.0, "num_tweets": 0, "mention_count": 0},
+        "youtube": {
+            "mention_count": 0,
+            "sentiment_sum": 0.0,
+            "num_videos": 0,
+            "positive_keyword_counts": {},
+            "negative_keyword_counts": {}
+        }
+    }
 
 # --- YouTube analysis ---
-club_stats_yt = {}
-for video in videos_col.find():
-    transcript = video.get("transcript_text", "")
-    sentences = sent_tokenize(transcript)
-    mentioned_clubs = set()
-
-    for sentence in sentences:
-        s = sentence.lower()
-        polarity = TextBlob(sentence).sentiment.polarity
-
-        # Match club names in transcript
-        for club in club_names:
-            if club in s:
-                club_stats_yt.setdefault(club, {...})
-                club_stats_yt[club]["mention_count"] += 1
-                club_stats_yt[club]["sentiment_scores"].append(polarity)
-                club_stats_yt[club]["all_text"].append(s)
-                mentioned_clubs.add(club)
+# Fold the transcript sentences of the videos in (after, upto] into the per-club YouTube
+# aggregates, streaming them one video at a time
+def fold_youtube(db, aggregates, after, upto, club_index, player_index, club_lookup, player_to_club,
+                 batch_size=CURSOR_BATCH_SIZE):
+    touched = set()
+    transcript_sents = db["sentences"].find(
+        {"source": "youtube_data", **id_range(after, upto, "source_id")},
+        {"source_id": 1, "lower": 1, "tokens": 1, "polarity": 1}
+    ).sort([("source_id", 1), ("offset", 1)]).batch_size(batch_size)
 
-        # Match player names and assign sentiment to their club
-        for player in player_names:
-            if player in s:
-                club = player_to_club[player].lower()
-                club_stats_yt.setdefault(club, {...})
-                club_stats_yt[club]["mention_count"] += 1
-                club_stats_yt[club]["sentiment_scores"].append(polarity)
-                club_stats_yt[club]["all_text"].append(s)
+    for _, video_sents in groupby(transcript_sents, key=lambda r: r["source_id"]):
+        mentioned_clubs = set()
+
+        for sent in video_sents:
+            # Club names count for themselves, player names count for their club. The sentence
+            # is tokenized once and every token is looked up in both indexes, so the cost grows
+            # with the sentence length rather than with the number of clubs and players.
+            tokens = name_tokens(sent["lower"])
+            hits = club_index.in_tokens(tokens)
+            hits += [player_to_club[name] for name in player_index.in_tokens(tokens)]
+            if not hits:
+                continue
+            keyword_counts = yt_lexicon.count(sent["tokens"])
+
+            for name in hits:
+                club = club_lookup.get(name.lower())
+                if not club:
+                    continue
+                stats = aggregates.setdefault(club, new_club_record(club))["youtube"]
+                stats["mention_count"] += 1
+                stats["sentiment_sum"] += sent["polarity"]
+                add_counts(stats["positive_keyword_counts"], keyword_counts["positive"])
+                add_counts(stats["negative_keyword_counts"], keyword_counts["negative"])
                 mentioned_clubs.add(club)
 
-    for club in mentioned_clubs:
-        club_stats_yt[club]["num_videos"] += 1
-
-# Normalize YouTube sentiment scores
-valid_yt = []
-yt_sentiments = []
-for club, stats in club_stats_yt.items():
-    if stats["mention_count"] > 0:
-        yt_sentiments.append(sum(stats["sentiment_scores"]) / len(stats["sentiment_scores"]))
-        valid_yt.append(club)
-scaler = MinMaxScaler(feature_range=(0, 10))
-yt_norm = scaler.fit_transform([[v] for v in yt_sentiments])
-
-# Build summary from YouTube
-yt_summary = {}
-for i, club_key in enumerate(valid_yt):
-    stats = club_stats_yt[club_key]
-    full_text = " ".join(stats["all_text"])
-    pos_kw = {k: full_text.count(k) for k in yt_positive if k in full_text}
-    neg_kw = {k: full_text.count(k) for k in yt_negative if k in full_text}
-    yt_summary[club_lookup[club_key]] = {
-        "mention_count": stats["mention_count"],
-        "num_videos": stats["num_videos"],
-        "avg_sentiment_youtube": round(yt_sentiments[i], 3),
-        "normalized_sentiment_youtube": round(yt_norm[i][0], 2),
-        "positive_keyword_counts": pos_kw,
-        "negative_keyword_counts": neg_kw
-    }
+        for club in mentioned_clubs:
+            aggregates[club]["youtube"]["num_videos"] += 1
+        touched |= mentioned_clubs
 
-# --- Aggregate final stats per club ---
-all_clubs = []
-for club in clubs:
-    cname = club["club_name"]
-    pnames = [p["name"] for p in players_col.find({"club_name": cname})]
-    num_players = len(pnames)
-
-    # Twitter and news
-    tw = tweets_col.find_one({"entity": cname, "source": "twitter"})
-    nw = news_col.find_one({"club": cname, "source": "news"})
-
-    tweets = [t["content"] for t in tw.get("mentions_data", [])] if tw else []
-    articles = [a["text"] for a in nw.get("articles", [])] if nw else []
-
-    if not articles:
-        continue
-
-    # Sentiment
-    sent_tw = [TextBlob(t).sentiment.polarity for t in tweets]
-    sent_news = [TextBlob(a).sentiment.polarity for a in articles]
-    avg_tw = sum(sent_tw) / len(sent_tw) if sent_tw else 0
-    avg_news = sum(sent_news) / len(sent_news)
-
-    # Positive/negative sentence extraction
-    pos_sents, neg_sents = [], []
-    for a in articles:
-        for s in sent_tokenize(a):
-            p = TextBlob(s).sentiment.polarity
-            if p > 0.6: pos_sents.append(s.strip())
-            elif p < -0.6: neg_sents.append(s.strip())
-
-    # Keyword counts
-    full = " ".join(articles).lower()
-    tokens = word_tokenize(full)
-    pos_kw = Counter([w for w in tokens if w in news_positive])
-    neg_kw = Counter([w for w in tokens if w in news_negative])
-
-    all_clubs.append({
-        "club_name": cname,
-        "num_players": num_players,
-        "player_names": pnames,
-        "twitter_summary": {
-            "mention_count": tw["mention_count"] if tw else 0,
-            "num_tweets": len(tweets)
-        },
-        "avg_sentiment_twitter": avg_tw,
-        "num_articles": len(articles),
-        "count_positive_sentences": len(pos_sents),
-        "count_negative_sentences": len(neg_sents),
-        "positive_keyword_counts": dict(pos_kw),
-        "negative_keyword_counts": dict(neg_kw),
-        "strong_positive_sentences": pos_sents,
-        "strong_negative_sentences": neg_sents,
-        "avg_sentiment_news": avg_news,
-        "youtube_summary": yt_summary.get(cname, {})
-    })
-
-# Normalize final scores
-S = normalize_list([c["avg_sentiment_news"] for c in all_clubs])
-FP = normalize_list([c["count_positive_sentences"] for c in all_clubs])
-KP = normalize_list([sum(c["positive_keyword_counts"].values()) for c in all_clubs])
-FN = normalize_list([c["count_negative_sentences"] for c in all_clubs])
-KN = normalize_list([sum(c["negative_keyword_counts"].values()) for c in all_clubs])
-TW = normalize_list([c["avg_sentiment_twitter"] for c in all_clubs], feature_range=(0, 10))
-RAW = [(S[i][0] + FP[i][0] + KP[i][0] - FN[i][0] - KN[i][0]) for i in range(len(all_clubs))]
-IMPACT = normalize_list(RAW, feature_range=(0, 10))
-
-# Save insights to MongoDB
-for i, c in enumerate(all_clubs):
-    doc = {
-        "club_name": c["club_name"],
-        "num_players": c["num_players"],
-        "player_names": c["player_names"],
-        "twitter_summary": c["twitter_summary"],
-        "avg_sentiment_twitter": round(c["avg_sentiment_twitter"], 3),
-        "normalized_sentiment_twitter": round(TW[i][0], 2),
-        "num_articles": c["num_articles"],
-        "negative_keyword_counts": c["negative_keyword_counts"],
-        "positive_keyword_counts": c["positive_keyword_counts"],
-        "strong_negative_sentences": c["strong_negative_sentences"],
-        "strong_positive_sentences": c["strong_positive_sentences"],
-        "avg_sentiment_news": round(c["avg_sentiment_news"], 3),
-        "normalized_sentiment_news": round(S[i][0], 2),
-        "youtube_summary": c["youtube_summary"],
-        "impact_score": round(IMPACT[i][0], 2)
-    }
+    return touched
+
+# --- Twitter analysis ---
+# Fold new twitter_data documents into the per-club Twitter aggregates.
+# New tweets are streamed through one projected cursor; each batch is scored in one cache lookup.
+def fold_twitter(db, aggregates, after, upto, sentiment_cache, batch_size=CURSOR_BATCH_SIZE):
+    touched = set()
+    query = {"source": "twitter", **id_range(after, upto)}
+    projection = {"entity": 1, "mention_count": 1, "mentions_data.content": 1}
+    cursor = db["twitter_data"].find(query, projection).sort("_id", 1).batch_size(batch_size)
+    for batch in batched(cursor, batch_size):
+        twitter_docs = [(tw["entity"], tw.get("mention_count", 0), [t["content"] for t in tw.get("mentions_data", [])])
+                        for tw in batch]
+        polarities = iter(sentiment_cache.polarities([t for _, _, tweets in twitter_docs for t in tweets]))
+
+        for cname, mention_count, tweets in twitter_docs:
+            stats = aggregates.setdefault(cname, new_club_record(cname))["twitter"]
+            stats["sentiment_sum"] += sum(next(polarities) for _ in tweets)
+            stats["num_tweets"] += len(tweets)
+            stats["mention_count"] += mention_count
+            touched.add(cname)
+    return touched
+
+# Normalize the aggregates of every club and save the final insight documents
+def finalize(db, aggregates, clubs, players, weights=None):
+    # Normalize YouTube sentiment scores over every club with YouTube mentions
+    valid_yt = [c for c, a in aggregates.items() if a["youtube"]["mention_count"] > 0]
+    yt_sentiments = [aggregates[c]["youtube"]["sentiment_sum"] / aggregates[c]["youtube"]["mention_count"]
+                     for c in valid_yt]
+    yt_norm = impact_scoring.normalize(yt_sentiments, feature_range=(0, 10))
+
+    # Build summary from YouTube
+    yt_summary = {}
+    for i, cname in enumerate(valid_yt):
+        stats = aggregates[cname]["youtube"]
+        yt_summary[cname] = {
+            "mention_count": stats["mention_count"],
+            "num_videos": stats["num_videos"],
+            "avg_sentiment_youtube": round(yt_sentiments[i], 3),
+            "normalized_sentiment_youtube": round(yt_norm[i], 2),
+            "positive_keyword_counts": stats["positive_keyword_counts"],
+            "negative_keyword_counts": stats["negative_keyword_counts"]
+        }
+
+    # Group the prefetched players by club once, so the per-club loop is pure computation
+    players_by_club = {}
+    for p in players:
+        players_by_club.setdefault(p["club_name"], []).append(p["name"])
+
+    # --- Aggregate final stats per club ---
+    all_clubs = []
+    for club in clubs:
+        cname = club["club_name"]
+        pnames = players_by_club.get(cname, [])
+        agg = aggregates.get(cname)
+        if not agg or not agg["news"]["num_articles"]:
+            continue
+        news, tw = agg["news"], agg["twitter"]
+
+        all_clubs.append({
+            "club_name": cname,
+            "num_players": len(pnames),
+            "player_names": pnames,
+            "twitter_summary": {
+                "mention_count": tw["mention_count"],
+                "num_tweets": tw["num_tweets"]
+            },
+            "avg_sentiment_twitter": tw["sentiment_sum"] / tw["num_tweets"] if tw["num_tweets"] else 0,
+            "num_articles": news["num_articles"],
+            "count_positive_sentences": len(news["strong_positive_sentences"]),
+            "count_negative_sentences": len(news["strong_negative_sentences"]),
+            "positive_keyword_counts": news["positive_keyword_counts"],
+            "negative_keyword_counts": news["negative_keyword_counts"],
+            "strong_positive_sentences": news["strong_positive_sentences"],
+            "strong_negative_sentences": news["strong_negative_sentences"],
+            "avg_sentiment_news": news["sentiment_sum"] / news["num_articles"],
+            "youtube_summary": yt_summary.get(cname, {})
+        })
+
+    if not all_clubs:
+        return
+
+    # Normalize final scores and combine them into the Impact Score in one vectorized pass
+    features = [[
+        c["avg_sentiment_news"],
+        c["count_positive_sentences"],
+        sum(c["positive_keyword_counts"].values()),
+        c["count_negative_sentences"],
+        sum(c["negative_keyword_counts"].values()),
+        c["avg_sentiment_twitter"]
+    ] for c in all_clubs]
+    norm, IMPACT = impact_scoring.score(features, weights=weights)
+    S, TW = norm["sentiment"], norm["twitter"]
+
+    # Save insights to MongoDB in bulk
+    with BulkWriter(db["club_insights"]) as writer:
+        for i, c in enumerate(all_clubs):
+            doc = {
+                "club_name": c["club_name"],
+                "num_players": c["num_players"],
+                "player_names": c["player_names"],
+                "twitter_summary": c["twitter_summary"],
+                "avg_sentiment_twitter": round(c["avg_sentiment_twitter"], 3),
+                "normalized_sentiment_twitter": round(TW[i], 2),
+                "num_articles": c["num_articles"],
+                "negative_keyword_counts": c["negative_keyword_counts"],
+                "positive_keyword_counts": c["positive_keyword_counts"],
+                "strong_negative_sentences": c["strong_negative_sentences"],
+                "strong_positive_sentences": c["strong_positive_sentences"],
+                "avg_sentiment_news": round(c["avg_sentiment_news"], 3),
+                "normalized_sentiment_news": round(S[i], 2),
+                "youtube_summary": c["youtube_summary"],
+                "impact_score": round(IMPACT[i], 2)
+            }
+
+            writer.update_one({"club_name": c["club_name"]}, {"$set": doc}, upsert=True)
+            safe_print(f" Saved final insights for {c['club_name']}")
+
+# Build club insights; incremental runs only fold in documents added since the last run
+def run(db, sentiment_cache, incremental=False, weights=None, batch_size=CURSOR_BATCH_SIZE, aliases=None):
+    aggregates_col = db["club_aggregates"]
+    if not incremental:
+        aggregates_col.delete_many({})
+        reset_watermarks(db, STAGE)
+
+    # Prepare reference mappings
+    clubs = list(db["clubs"].find({}, {"club_name": 1}))
+    club_lookup = {club["club_name"].lower(): club["club_name"] for club in clubs}
+    players = list(db["players"].find({}, {"name": 1, "club_name": 1}))
+    player_to_club = {p["name"]: p["club_name"] for p in players}
+
+    # news_data documents present now; the articles they reference were registered before
+    # them, so the preprocessing run below covers every one of those articles
+    news_upto = latest_id(db["news_data"])
+
+    # Split and score any new articles/transcripts once; both insight scripts share the result.
+    # Transcripts changed in place are re-split there too, and a full build reads them back.
+    preprocess.run(db, sentiment_cache)
+
+    # Club and player names are looked up on the same accent-folded name tokens (and player
+    # aliases) as in player_insights.py, so both builders attribute a sentence alike
+    club_index = NameIndex([club["club_name"] for club in clubs])
+    player_index = NameIndex(list(player_to_club), aliases)
+
+    aggregates = load_aggregates(aggregates_col, "club_name")
+    touched = set()
+    watermarks = {}
+
+    # New videos are bounded by what the preprocessing stage has already split
+    ranges = {"youtube_data": get_watermark(db, preprocess.STAGE, "youtube_data"), "news_data": news_upto}
+    for source, upto in ranges.items():
+        after = get_watermark(db, STAGE, source)
+        if upto is None or upto == after:
+            continue
+        if source == "youtube_data":
+            touched |= fold_youtube(db, aggregates, after, upto, club_index, player_index, club_lookup,
+                                        player_to_club, batch_size)
+        else:
+            touched |= fold_news(db, aggregates, "club", after, upto, news_lexicon, new_club_record, batch_size)
+        watermarks[source] = upto
+
+    after = get_watermark(db, STAGE, "twitter_data")
+    upto = latest_id(db["twitter_data"])
+    if upto is not None and upto != after:
+        touched |= fold_twitter(db, aggregates, after, upto, sentiment_cache, batch_size)
+        watermarks["twitter_data"] = upto
+
+    save_aggregates(aggregates_col, "club_name", aggregates, touched)
+    for source, last_id in watermarks.items():
+        set_watermark(db, STAGE, source, last_id)
+    safe_print(f" Folded new documents into {len(touched)} club aggregates")
+
+    finalize(db, aggregates, clubs, players, weights)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build club insights from Twitter, News and YouTube data")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only fold in documents added since the last run (new players/clubs need a full run)")
+    parser.add_argument("--prerender-wordclouds", action="store_true",
+                        help="render every keyword cloud into the word cloud cache after the build")
+    parser.add_argument("--weights", type=json.loads, default=None,
+                        help='JSON overrides of the impact weights, e.g. \'{"twitter": 0.5}\'')
+    parser.add_argument("--aliases", default=ALIASES_PATH,
+                        help='JSON file of extra player names, e.g. \'{"Heung-min Son": ["sonny"]}\'')
+    parser.add_argument("--batch-size", type=int, default=CURSOR_BATCH_SIZE,
+                        help="documents fetched per cursor round trip while folding")
+    args = parser.parse_args()
+
+    # Download NLTK resources
+    nltk.download("punkt")
+
+    # MongoDB connection
+    client = MongoClient("uri")  # Replace with your actual MongoDB URI
+    db = client["media_impact_db"]
+
+    # Polarity scores are cached on disk and shared with player_insights.py
+    sentiment_cache = SentimentCache()
+
+    run(db, sentiment_cache, incremental=args.incremental, weights=args.weights, batch_size=args.batch_size,
+        aliases=load_aliases(args.aliases))
 
-    insights_col.update_one({"club_name": c["club_name"]}, {"$set": doc}, upsert=True)
-    safe_print(f" Saved final insights for {c['club_name']}")
+    # Optional: lay out every word cloud now so dashboard page loads never pay for it
+    if args.prerender_wordclouds:
+        from wordcloud_cache import prerender
+        prerender(db, "club_insights")
 
-safe_print("\n All club insights updated with Twitter, News, and YouTube data.")
+    safe_print("\n All club insights updated with Twitter, News, and YouTube data.")
+    safe_print(sentiment_cache.report())
+    sentiment_cache.close()
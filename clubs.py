@@ -1,26 +1,26 @@
-import requests
 from bs4 import BeautifulSoup
 from pymongo import MongoClient
 from PIL import Image
 from io import BytesIO
-import base64
-import time
+from http_cache import fetch
+from image_variants import render_variants
+from image_store import IMAGES_COLLECTION, put_image, put_variants
+from mongo_sink import BulkWriter
 
 # MongoDB connection setup
 client = MongoClient("uri")  
 db = client["media_impact_db"] #database name
 clubs_col = db["clubs"]  # This collection will store the Premier League clubs
 
-# Function to convert an image URL to a base64 string
-def image_to_base64(url):
+# Function to download an image URL as JPEG bytes
+def image_to_jpeg(url):
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
+        response = fetch(url, timeout=10)
         response.raise_for_status()  # Raises HTTPError if the response was unsuccessful
         img = Image.open(BytesIO(response.content)).convert("RGB")  # Convert image to RGB
         buffered = BytesIO()
         img.save(buffered, format="JPEG")  # Save to memory in JPEG format
-        return base64.b64encode(buffered.getvalue()).decode("utf-8")  # Encode image as base64 string
+        return buffered.getvalue()
     except Exception as e:
         print(f" Error downloading image: {e}")
         return None
@@ -28,10 +28,9 @@ def image_to_base64(url):
 # Base URL and Premier League page URL
 base_url = "https://www.transfermarkt.co.uk"
 pl_url = f"{base_url}/premier-league/startseite/wettbewerb/GB1"  # URL for Premier League overview page
-headers = {"User-Agent": "Mozilla/5.0"}
 
-# Send request to the Premier League page and parse the HTML
-response = requests.get(pl_url, headers=headers)
+# Fetch the Premier League page (shared session, disk cache) and parse the HTML
+response = fetch(pl_url)
 soup = BeautifulSoup(response.text, "html.parser")
 
 # Find the table with all Premier League clubs
@@ -44,39 +43,52 @@ if not table:
 rows = table.select("tbody tr")
 print(f" Found {len(rows)} rows.")  # Number of clubs found
 
-# Loop over each row to extract club data
-for row in rows:
-    try:
-        # Find the anchor tag that contains the club name and relative link
-        club_link = row.select_one('td a[title][href^="/"]')
-        if not club_link:
-            print(" Club link not found in row.")
-            continue
-
-        club_name = club_link["title"].strip()  # Club name
-        club_href = club_link["href"].strip()  # Relative URL
-        # Convert overview page to squad page URL (kader), adding "/plus/1" for full squad
-        club_url = base_url + club_href.replace("startseite", "kader") + "/plus/1"
+# Loop over each row to extract club data; upserts are buffered and flushed in bulk.
+# Logos are flushed to the image store before any club upsert is queued, so no club
+# references an image that is not stored yet.
+clubs = []
+with BulkWriter(clubs_col) as clubs_writer, BulkWriter(db[IMAGES_COLLECTION]) as images_writer:
+    for row in rows:
+        try:
+            # Find the anchor tag that contains the club name and relative link
+            club_link = row.select_one('td a[title][href^="/"]')
+            if not club_link:
+                print(" Club link not found in row.")
+                continue
 
-        # Get the club logo image
-        logo_img = row.select_one("td img")
-        # Prefer "data-src" over "src" for image URL
-        logo_url = logo_img.get("data-src") or logo_img.get("src") if logo_img else None
-        logo_base64 = image_to_base64(logo_url) if logo_url else None
+            club_name = club_link["title"].strip()  # Club name
+            club_href = club_link["href"].strip()  # Relative URL
+            # Convert overview page to squad page URL (kader), adding "/plus/1" for full squad
+            club_url = base_url + club_href.replace("startseite", "kader") + "/plus/1"
 
-        # Store or update club data in MongoDB
-        clubs_col.update_one(
-            {"club_name": club_name},  # Match on club name
-            {"$set": {
+            # Get the club logo image
+            logo_img = row.select_one("td img")
+            # Prefer "data-src" over "src" for image URL
+            logo_url = logo_img.get("data-src") or logo_img.get("src") if logo_img else None
+            logo_jpeg = image_to_jpeg(logo_url) if logo_url else None
+            # Logo and its display variants (45px PNG/WebP) go to the image store; the club keeps references
+            clubs.append({
                 "club_name": club_name,
                 "squad_url": club_url,
-                "logo_base64": logo_base64
-            }},
-            upsert=True  # Insert if the club doesn't exist
-        )
+                "logo_ref": put_image(images_writer, logo_jpeg, "image/jpeg"),
+                "logo_variant_refs": put_variants(images_writer, render_variants(logo_jpeg, "logo"))
+            })
 
-        print(f" Stored: {club_name}")
-        time.sleep(0.5)  # Pause to avoid sending too many requests too quickly
+        except Exception as e:
+            print(f" Error processing row: {e}")
 
-    except Exception as e:
-        print(f" Error processing row: {e}")
+    # If a logo write failed the clubs keep their previous logo references; re-run to fetch them
+    images_writer.flush()
+    if images_writer.errors:
+        print(" Logo writes failed; logo references are not updated")
+
+    for club in clubs:
+        if images_writer.errors:
+            del club["logo_ref"], club["logo_variant_refs"]
+        # Queue the club upsert; written to MongoDB in bulk
+        clubs_writer.update_one(
+            {"club_name": club["club_name"]},  # Match on club name
+            {"$set": club},
+            upsert=True  # Insert if the club doesn't exist
+        )
+        print(f" Stored: {club['club_name']}")
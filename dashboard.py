@@ -1,19 +1,9 @@
 import streamlit as st
-from pymongo import MongoClient
-import base64
-from PIL import Image
-from io import BytesIO
 import pandas as pd
 import plotly.express as px
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-
-# --- MongoDB Connection ---
-client = MongoClient(st.secrets["mongo"]["uri"])
-db = client["media_impact_db"]
-clubs_col = db["clubs"]
-club_insights_col = db["club_insights"]
-players_col = db["player_insights"]
+from wordcloud_cache import render_wordcloud, POSITIVE_COLORMAP, NEGATIVE_COLORMAP
+from dashboard_data import (load_leaderboard, load_club_detail, load_club_logo,
+                            load_club_players, load_player_detail, load_player_videos)
 
 # --- Page Configuration ---
 st.set_page_config(page_title="Premier League Media Impact", layout="wide")
@@ -57,28 +47,19 @@ st.markdown("This dashboard analyzes the media impact of Premier League clubs an
 
 # --- Club Selector ---
 st.markdown('<div class="select-style">Select a Club</div>', unsafe_allow_html=True)
-club_docs = list(club_insights_col.find())
+club_docs = load_leaderboard()
 club_names = sorted([club["club_name"] for club in club_docs])
 selected_club = st.selectbox("", [""] + club_names)
 
 if selected_club:
     # --- Club Header with Logo ---
-    club_data = next((c for c in club_docs if c["club_name"] == selected_club), None)
-    logo_data = clubs_col.find_one({"club_name": selected_club})
+    club_data = load_club_detail(selected_club)
+    logo_src = load_club_logo(selected_club)
 
+    # Logos are pre-rendered at ingest time (image_variants.py), so they are embedded as-is
     st.markdown('<div class="club-header">', unsafe_allow_html=True)
-    if logo_data and "logo_base64" in logo_data:
-        try:
-            logo_bytes = base64.b64decode(logo_data["logo_base64"])
-            logo_img = Image.open(BytesIO(logo_bytes)).convert("RGBA")
-            transparent_background = Image.new("RGBA", logo_img.size, (255, 255, 255, 0))
-            transparent_background.paste(logo_img, mask=logo_img.split()[3])
-            buffered = BytesIO()
-            transparent_background.save(buffered, format="PNG")
-            logo_b64 = base64.b64encode(buffered.getvalue()).decode()
-            st.markdown(f'<div class="club-name">{selected_club} <img class="club-logo-emoji" src="data:image/png;base64,{logo_b64}"/></div>', unsafe_allow_html=True)
-        except Exception as e:
-            st.warning(f"Could not load logo: {e}")
+    if logo_src:
+        st.markdown(f'<div class="club-name">{selected_club} <img class="club-logo-emoji" src="{logo_src}"/></div>', unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
     # --- Key Club Metrics ---
@@ -115,29 +96,21 @@ if selected_club:
         else:
             st.write("No negative keywords found.")
 
-    # --- Word Clouds ---
+    # --- Word Clouds (served from the on-disk cache, rendered only on a miss) ---
     st.subheader("☁️ WordCloud of Keywords")
     col_wc1, col_wc2 = st.columns(2)
 
     with col_wc1:
         st.markdown("**🟢 Positive Keywords Cloud**")
         if not df_pos.empty:
-            wc_pos = WordCloud(width=600, height=300, background_color="white", colormap="Greens").generate_from_frequencies(dict(positive_keywords))
-            fig, ax = plt.subplots(figsize=(6, 3))
-            ax.imshow(wc_pos, interpolation="bilinear")
-            ax.axis("off")
-            st.pyplot(fig)
+            st.image(render_wordcloud(positive_keywords, POSITIVE_COLORMAP), use_container_width=True)
         else:
             st.write("No positive keywords to generate cloud.")
 
     with col_wc2:
         st.markdown("**🔴 Negative Keywords Cloud**")
         if not df_neg.empty:
-            wc_neg = WordCloud(width=600, height=300, background_color="white", colormap="Reds").generate_from_frequencies(dict(negative_keywords))
-            fig, ax = plt.subplots(figsize=(6, 3))
-            ax.imshow(wc_neg, interpolation="bilinear")
-            ax.axis("off")
-            st.pyplot(fig)
+            st.image(render_wordcloud(negative_keywords, NEGATIVE_COLORMAP), use_container_width=True)
         else:
             st.write("No negative keywords to generate cloud.")        
 
@@ -176,21 +149,16 @@ if selected_club:
     # --- Player Insights ---
     st.markdown("---")
     st.subheader("🎯 Select a Player")
-    players = list(players_col.find({"club": selected_club}))
+    players = load_club_players(selected_club)
     player_names = sorted([p["name"] for p in players])
     selected_player = st.selectbox("Select a Player", [""] + player_names)
 
     if selected_player:
-        player = next((p for p in players if p["name"] == selected_player), None)
+        player = load_player_detail(selected_player)
         st.subheader(f"{selected_player} - Insights")
 
-        if player and "photo_base64" in player:
-            try:
-                img_data = base64.b64decode(player["photo_base64"])
-                player_img = Image.open(BytesIO(img_data)).convert("RGBA")
-                st.image(player_img, width=120)
-            except Exception as e:
-                st.warning(f"Could not load player image: {e}")
+        if player and player.get("photo_src"):
+            st.markdown(f'<img src="{player["photo_src"]}" width="120"/>', unsafe_allow_html=True)
 
         st.metric("Overall Impact Score", player.get("impact_score", 0))
 
@@ -222,20 +190,12 @@ if selected_club:
         with col_wc_p1:
             st.markdown("**🟢 Positive Keywords Cloud**")
             if not df_pos_p.empty:
-                wc_pos_p = WordCloud(width=600, height=300, background_color="white", colormap="Greens").generate_from_frequencies(dict(player.get("positive_keyword_counts", {})))
-                fig, ax = plt.subplots(figsize=(6, 3))
-                ax.imshow(wc_pos_p, interpolation="bilinear")
-                ax.axis("off")
-                st.pyplot(fig)
+                st.image(render_wordcloud(player.get("positive_keyword_counts", {}), POSITIVE_COLORMAP), use_container_width=True)
 
         with col_wc_p2:
             st.markdown("**🔴 Negative Keywords Cloud**")
             if not df_neg_p.empty:
-                wc_neg_p = WordCloud(width=600, height=300, background_color="white", colormap="Reds").generate_from_frequencies(dict(player.get("negative_keyword_counts", {})))
-                fig, ax = plt.subplots(figsize=(6, 3))
-                ax.imshow(wc_neg_p, interpolation="bilinear")
-                ax.axis("off")
-                st.pyplot(fig)
+                st.image(render_wordcloud(player.get("negative_keyword_counts", {}), NEGATIVE_COLORMAP), use_container_width=True)
 
         # --- Player Impact Comparison (within club) ---
         st.subheader("📈 Impact Score Comparison (Within Club)")
@@ -262,23 +222,17 @@ if selected_club:
             if video_ids:
                 st.markdown("#### 🎥 Player's Highlight Videos")
 
+                # One batched query per player; thumbnails load lazily from YouTube's CDN
                 videos_html = "<div style='display: flex; overflow-x: auto; gap: 30px; padding-bottom: 15px;'>"
-                for video_id in video_ids:
-                    video_doc = db["youtube_data"].find_one({"video_id": video_id})
-                    if video_doc:
-                        title = video_doc.get("title", "Untitled")
-                        thumbnail_b64 = video_doc.get("thumbnail_base64")
-                        video_url = video_doc.get("video_url")
-
-                        if thumbnail_b64 and video_url:
-                            videos_html += f"""
-                            <div style='min-width: 300px; max-width: 300px;'>
-                                <a href='{video_url}' target='_blank' style='text-decoration: none;'>
-                                    <img src='data:image/png;base64,{thumbnail_b64}' style='width: 100%; border-radius: 12px; box-shadow: 0 2px 8px rgba(0,0,0,0.15);' />
-                                    <div style='font-weight: 600; margin-top: 8px; color: #333;'>{title}</div>
-                                </a>
-                            </div>
-                            """
+                for video in load_player_videos(selected_player, tuple(video_ids)):
+                    videos_html += f"""
+                    <div style='min-width: 300px; max-width: 300px;'>
+                        <a href='{video["video_url"]}' target='_blank' style='text-decoration: none;'>
+                            <img src='{video["thumbnail_url"]}' loading='lazy' style='width: 100%; border-radius: 12px; box-shadow: 0 2px 8px rgba(0,0,0,0.15);' />
+                            <div style='font-weight: 600; margin-top: 8px; color: #333;'>{video["title"]}</div>
+                        </a>
+                    </div>
+                    """
                 videos_html += "</div>"
 
                 from streamlit.components.v1 import html
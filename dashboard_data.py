@@ -0,0 +1,92 @@
+import streamlit as st
+import base64
+from pymongo import MongoClient
+from image_store import get_image
+
+# Cached, projected data access for dashboard.py.
+# The Mongo client is created once per server process (st.cache_resource) and every
+# query result is memoized for CACHE_TTL seconds (st.cache_data), so widget-triggered
+# reruns are served from memory instead of Atlas. Projections keep large fields such as
+# strong-sentence lists out of the queries that do not need them. Images are fetched from
+# the content-addressed image store only when shown, and cached by reference.
+
+# Seconds before cached query results are refreshed from MongoDB
+CACHE_TTL = 600
+
+# Small (320x180) thumbnail served and cached by YouTube's image CDN
+YOUTUBE_THUMBNAIL_URL = "https://i.ytimg.com/vi/{video_id}/mqdefault.jpg"
+
+# --- MongoDB Connection (one client per server process) ---
+@st.cache_resource(show_spinner=False)
+def get_db():
+    client = MongoClient(st.secrets["mongo"]["uri"])
+    return client["media_impact_db"]
+
+# Slim per-club rows for the selector and the comparison charts
+@st.cache_data(ttl=CACHE_TTL)
+def load_leaderboard():
+    projection = {"_id": 0, "club_name": 1, "normalized_sentiment_twitter": 1, "impact_score": 1}
+    return list(get_db()["club_insights"].find({}, projection))
+
+# Metrics and keyword counts of one club
+@st.cache_data(ttl=CACHE_TTL)
+def load_club_detail(club_name):
+    projection = {"_id": 0, "club_name": 1, "num_players": 1, "normalized_sentiment_twitter": 1,
+                  "impact_score": 1, "positive_keyword_counts": 1, "negative_keyword_counts": 1}
+    return get_db()["club_insights"].find_one({"club_name": club_name}, projection)
+
+# Reference of the image to display: the pre-rendered WebP/PNG variant, else the original
+def display_ref(variant_refs, original_ref):
+    variant_refs = variant_refs or {}
+    return variant_refs.get("webp") or variant_refs.get("png") or original_ref
+
+# Data URI of a stored image; images never change under a reference, so no TTL is needed
+@st.cache_data(max_entries=1000, show_spinner=False)
+def load_image_src(ref):
+    image = get_image(get_db(), ref)
+    if not image:
+        return None
+    data, content_type = image
+    return f"data:{content_type};base64,{base64.b64encode(data).decode('utf-8')}"
+
+# Ready-to-embed logo of one club (None if missing)
+@st.cache_data(ttl=CACHE_TTL)
+def load_club_logo(club_name):
+    doc = get_db()["clubs"].find_one({"club_name": club_name}, {"_id": 0, "logo_variant_refs": 1, "logo_ref": 1})
+    return load_image_src(display_ref(doc.get("logo_variant_refs"), doc.get("logo_ref"))) if doc else None
+
+# Slim per-player rows of one club for the selector and the comparison chart
+@st.cache_data(ttl=CACHE_TTL)
+def load_club_players(club_name):
+    projection = {"_id": 0, "name": 1, "impact_score": 1}
+    return list(get_db()["player_insights"].find({"club": club_name}, projection))
+
+# Photo, metrics, keyword counts and video ids of one player
+@st.cache_data(ttl=CACHE_TTL)
+def load_player_detail(name):
+    projection = {"_id": 0, "name": 1, "club": 1, "impact_score": 1, "photo_variant_refs": 1, "photo_ref": 1,
+                  "positive_keyword_counts": 1, "negative_keyword_counts": 1,
+                  "youtube_summary.video_ids": 1}
+    player = get_db()["player_insights"].find_one({"name": name}, projection)
+    if player:
+        ref = display_ref(player.pop("photo_variant_refs", None), player.pop("photo_ref", None))
+        player["photo_src"] = load_image_src(ref) if ref else None
+    return player
+
+# Title, URL and thumbnail URL of a player's highlight videos, fetched in one $in query
+# without the transcripts; cached per player and kept in the order of video_ids
+@st.cache_data(ttl=CACHE_TTL)
+def load_player_videos(player_name, video_ids):
+    projection = {"_id": 0, "video_id": 1, "title": 1, "video_url": 1}
+    docs = get_db()["youtube_data"].find({"video_id": {"$in": list(video_ids)}}, projection)
+    by_id = {doc["video_id"]: doc for doc in docs}
+    videos = []
+    for video_id in video_ids:
+        doc = by_id.get(video_id)
+        if doc and doc.get("video_url"):
+            videos.append({
+                "title": doc.get("title") or "Untitled",
+                "video_url": doc["video_url"],
+                "thumbnail_url": YOUTUBE_THUMBNAIL_URL.format(video_id=video_id)
+            })
+    return videos
@@ -0,0 +1,143 @@
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import OperationFailure
+from bson import ObjectId
+import argparse
+
+# Index bootstrap and query-plan checker for media_impact_db.
+# INDEXES declares every index the scrapers, insight builders and dashboard rely on
+# (unique keys match the upsert filters); ensure_indexes() applies them idempotently.
+# check_query_plans() explains the queries the pipeline issues and flags any COLLSCAN.
+
+# collection -> list of (keys, options)
+INDEXES = {
+    "clubs": [
+        ([("club_name", ASCENDING)], {"unique": True}),
+    ],
+    "players": [
+        ([("name", ASCENDING), ("club_name", ASCENDING)], {"unique": True}),
+        ([("club_name", ASCENDING)], {}),
+    ],
+    "news_data": [
+        ([("club", ASCENDING), ("source", ASCENDING)], {}),
+        ([("player", ASCENDING), ("source", ASCENDING)], {}),
+    ],
+    "twitter_data": [
+        ([("entity", ASCENDING), ("source", ASCENDING)], {}),
+    ],
+    "youtube_data": [
+        ([("video_id", ASCENDING)], {"unique": True}),
+    ],
+    "articles": [
+        ([("hash", ASCENDING)], {"unique": True}),
+    ],
+    "documents": [
+        ([("source", ASCENDING), ("source_id", ASCENDING)], {}),
+    ],
+    "sentences": [
+        ([("source", ASCENDING), ("source_id", ASCENDING), ("offset", ASCENDING)], {}),
+    ],
+    "club_aggregates": [
+        ([("club_name", ASCENDING)], {"unique": True}),
+    ],
+    "player_aggregates": [
+        ([("name", ASCENDING)], {"unique": True}),
+    ],
+    "club_insights": [
+        ([("club_name", ASCENDING)], {"unique": True}),
+    ],
+    "player_insights": [
+        ([("name", ASCENDING)], {"unique": True}),
+        ([("club", ASCENDING)], {}),
+    ],
+}
+
+# Representative queries issued by the pipeline and the dashboard: (collection, filter, sort)
+SAMPLE_ID = ObjectId()
+QUERIES = [
+    ("clubs", {"club_name": "x"}, None),
+    ("players", {"name": "x", "club_name": "x"}, None),
+    ("players", {"club_name": "x"}, None),
+    ("news_data", {"club": "x", "source": "news"}, None),
+    ("news_data", {"player": "x", "source": "news"}, None),
+    ("news_data", {"_id": {"$gt": SAMPLE_ID, "$lte": SAMPLE_ID}}, None),
+    ("twitter_data", {"entity": "x", "source": "twitter"}, None),
+    ("twitter_data", {"entity": "x"}, None),
+    ("twitter_data", {"source": "twitter", "_id": {"$gt": SAMPLE_ID, "$lte": SAMPLE_ID}}, [("_id", 1)]),
+    ("youtube_data", {"video_id": "x"}, None),
+    ("youtube_data", {"video_id": {"$in": ["x", "y"]}}, None),
+    ("youtube_data", {"_id": {"$gt": SAMPLE_ID, "$lte": SAMPLE_ID}}, [("_id", 1)]),
+    ("news_data", {"_id": {"$gt": SAMPLE_ID, "$lte": SAMPLE_ID}}, [("_id", 1)]),
+    ("articles", {"hash": "x"}, None),
+    ("articles", {"_id": {"$gt": SAMPLE_ID, "$lte": SAMPLE_ID}}, [("_id", 1)]),
+    ("documents", {"source": "articles", "source_id": {"$in": [SAMPLE_ID]}}, None),
+    ("sentences", {"source": "youtube_data", "source_id": {"$gt": SAMPLE_ID, "$lte": SAMPLE_ID}},
+     [("source_id", 1), ("offset", 1)]),
+    ("sentences", {"source": "articles", "source_id": {"$in": [SAMPLE_ID]}},
+     [("source_id", 1), ("offset", 1)]),
+    ("club_aggregates", {"club_name": "x"}, None),
+    ("player_aggregates", {"name": "x"}, None),
+    ("club_insights", {"club_name": "x"}, None),
+    ("player_insights", {"name": "x"}, None),
+    ("player_insights", {"club": "x"}, None),
+]
+
+# Name an index after its keys, e.g. "name_1_club_name_1"
+def index_name(keys):
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+# Create every declared index; existing identical indexes are left untouched
+def ensure_indexes(db):
+    failures = 0
+    for col_name, indexes in INDEXES.items():
+        for keys, options in indexes:
+            name = index_name(keys)
+            try:
+                db[col_name].create_index(keys, name=name, **options)
+                print(f" Index ok: {col_name}.{name}")
+            except OperationFailure as e:
+                # e.g. duplicate keys blocking a unique index, or a conflicting existing index
+                failures += 1
+                print(f" Could not create {col_name}.{name}: {e}")
+    return failures
+
+# Stage names used anywhere in a query plan tree
+def plan_stages(plan):
+    stages = [plan.get("stage")]
+    for child_key in ("inputStage", "queryPlan"):
+        if child_key in plan:
+            stages += plan_stages(plan[child_key])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return [s for s in stages if s]
+
+# Explain every representative query and report the ones that scan a whole collection
+def check_query_plans(db):
+    flagged = []
+    for col_name, query, sort in QUERIES:
+        command = {"find": col_name, "filter": query}
+        if sort:
+            command["sort"] = dict(sort)
+        explain = db.command("explain", command, verbosity="queryPlanner")
+        stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+        if "COLLSCAN" in stages:
+            flagged.append((col_name, query, sort))
+            print(f" COLLSCAN: {col_name} {query} sort={sort}")
+        else:
+            print(f" ok ({' <- '.join(stages)}): {col_name} {query}")
+    print(f"\n {len(flagged)} of {len(QUERIES)} queries scan a whole collection")
+    return flagged
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the media_impact_db indexes and check query plans")
+    parser.add_argument("--check", action="store_true", help="only explain the pipeline queries, do not create indexes")
+    args = parser.parse_args()
+
+    # MongoDB connection setup
+    client = MongoClient("uri")  # Replace with your actual MongoDB URI
+    db = client["media_impact_db"]
+
+    if not args.check:
+        ensure_indexes(db)
+    flagged = check_query_plans(db)
+    exit(1 if flagged else 0)
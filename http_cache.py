@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from rate_governor import governor
+
+# Shared HTTP fetch layer for the Transfermarkt scrapers.
+# One keep-alive requests.Session (pooled connections) serves every request, and
+# successful responses are kept on disk keyed by URL. A cached copy younger than TTL is
+# returned without touching the network; an older one is revalidated with
+# If-None-Match/If-Modified-Since, so an unchanged page costs a 304 instead of a download.
+
+CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", os.path.join(".cache", "http"))
+TTL = float(os.environ.get("HTTP_CACHE_TTL", str(24 * 3600)))  # seconds a cached copy is fresh
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+
+session = requests.Session()
+session.headers.update(HEADERS)
+session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=16))
+session.mount("http://", HTTPAdapter(pool_connections=8, pool_maxsize=16))
+
+# Paths of the metadata and body files of a URL
+def cache_paths(url, cache_dir=CACHE_DIR):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, key + ".json"), os.path.join(cache_dir, key + ".body")
+
+# Write a file atomically so concurrent readers never see a partial copy
+def write_atomic(path, data, mode="wb"):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, mode) as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def load_entry(url, cache_dir=CACHE_DIR):
+    meta_path, body_path = cache_paths(url, cache_dir)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            return meta, f.read()
+    except (OSError, ValueError):
+        return None, None
+
+def store_entry(url, response, cache_dir=CACHE_DIR):
+    meta_path, body_path = cache_paths(url, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    meta = {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_type": response.headers.get("Content-Type"),
+        "encoding": response.encoding,
+        "fetched_at": time.time()
+    }
+    write_atomic(body_path, response.content)
+    write_atomic(meta_path, json.dumps(meta), mode="w")
+    return meta
+
+# Rebuild a requests.Response from a cache entry, so callers handle both the same way
+def cached_response(meta, body):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = meta["url"]
+    response._content = body
+    response.encoding = meta.get("encoding")
+    response.headers = CaseInsensitiveDict({"Content-Type": meta.get("content_type") or ""})
+    response.from_cache = True
+    return response
+
+# GET a URL through the shared session, the disk cache and the rate governor
+def fetch(url, ttl=TTL, timeout=10, cache_dir=CACHE_DIR):
+    meta, body = load_entry(url, cache_dir)
+    if meta and time.time() - meta["fetched_at"] < ttl:
+        return cached_response(meta, body)
+
+    headers = {}
+    if meta and meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta and meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = governor.get(url, session=session, headers=headers, timeout=timeout)
+    if response.status_code == 304 and meta:
+        # Unchanged: the cached copy is fresh again
+        meta["fetched_at"] = time.time()
+        write_atomic(cache_paths(url, cache_dir)[0], json.dumps(meta), mode="w")
+        return cached_response(meta, body)
+    if response.status_code == 200:
+        store_entry(url, response, cache_dir)
+    response.from_cache = False
+    return response
@@ -0,0 +1,147 @@
+from pymongo import MongoClient
+from bson import Binary
+import argparse
+import base64
+import hashlib
+from itertools import islice
+from mongo_sink import BulkWriter
+
+# Content-addressed image store for logos, player photos and their display variants.
+# Each image is stored once in the `images` collection as raw BSON Binary under the
+# SHA-256 of its bytes; other documents only hold that hash as a reference (e.g.
+# "logo_ref", "photo_variant_refs"), so identical images are deduplicated and unprojected
+# reads no longer carry base64 payloads.
+
+IMAGES_COLLECTION = "images"
+
+# Reference (SHA-256 hex digest) of an image's bytes
+def image_ref(data):
+    return hashlib.sha256(data).hexdigest()
+
+# Store image bytes (once) and return their reference.
+# `target` is the images collection or a BulkWriter on it; both take update_one.
+def put_image(target, data, content_type):
+    if not data:
+        return None
+    ref = image_ref(data)
+    target.update_one(
+        {"_id": ref},
+        {"$setOnInsert": {"data": Binary(data), "content_type": content_type, "size": len(data)}},
+        upsert=True
+    )
+    return ref
+
+# Store every variant of a {format: bytes} dict and return {format: reference}
+def put_variants(target, variants):
+    if not variants:
+        return None
+    return {fmt: put_image(target, data, f"image/{fmt}") for fmt, data in variants.items()}
+
+# (bytes, content_type) of a stored image, or None
+def get_image(db, ref):
+    if not ref:
+        return None
+    doc = db[IMAGES_COLLECTION].find_one({"_id": ref}, {"data": 1, "content_type": 1})
+    return (bytes(doc["data"]), doc["content_type"]) if doc else None
+
+# The references among `refs` whose images are in the store (looked up 500 at a time)
+def stored_refs(db, refs):
+    refs = iter(set(refs))
+    stored = set()
+    while batch := list(islice(refs, 500)):
+        stored.update(img["_id"] for img in db[IMAGES_COLLECTION].find({"_id": {"$in": batch}}, {"_id": 1}))
+    return stored
+
+# Legacy base64 fields moved to references by migrate():
+# collection -> [(base64 field, reference field, kind)], kind "original" or "variants"
+LEGACY_FIELDS = {
+    "clubs": [("logo_base64", "logo_ref", "original"), ("logo_variants", "logo_variant_refs", "variants")],
+    "players": [("photo_base64", "photo_ref", "original"), ("photo_variants", "photo_variant_refs", "variants")],
+    "player_insights": [("photo_base64", "photo_ref", "original"), ("photo_variants", "photo_variant_refs", "variants")],
+}
+
+# Image fields nothing reads any more, dropped by migrate(): video thumbnails, which the
+# dashboard loads from YouTube's CDN (dashboard_data.YOUTUBE_THUMBNAIL_URL)
+UNUSED_FIELDS = {
+    "youtube_data": ["thumbnail_base64", "thumbnail_ref"],
+}
+
+# References held in a reference field: one ref, or the refs of a {format: ref} dict
+def refs_of(value, kind):
+    if not value:
+        return []
+    return [value] if kind == "original" else list(value.values())
+
+# Move every stored base64 image into the image store and replace it with a reference.
+# Pass 1 stores the images and sets the references but keeps the base64 fields; pass 2
+# only removes a base64 field once every image it references is confirmed in the store,
+# so a write error or a crash never loses an image and the migration can simply be re-run.
+def migrate(db):
+    with BulkWriter(db[IMAGES_COLLECTION]) as images_writer:
+        for col_name, fields in LEGACY_FIELDS.items():
+            legacy = [old for old, _, _ in fields]
+            query = {"$or": [{old: {"$exists": True}} for old in legacy]}
+            count = 0
+            with BulkWriter(db[col_name]) as writer:
+                for doc in db[col_name].find(query, {old: 1 for old in legacy}):
+                    refs = {}
+                    for old, new, kind in fields:
+                        value = doc.get(old)
+                        if not value:
+                            continue
+                        if kind == "original":
+                            refs[new] = put_image(images_writer, base64.b64decode(value), "image/jpeg")
+                        else:
+                            refs[new] = put_variants(
+                                images_writer, {fmt: base64.b64decode(b64) for fmt, b64 in value.items()})
+                    if refs:
+                        writer.update_one({"_id": doc["_id"]}, {"$set": refs})
+                        count += 1
+                images_writer.flush()
+            print(f" Stored images of {count} documents in {col_name}")
+
+    for col_name, fields in LEGACY_FIELDS.items():
+        legacy = [old for old, _, _ in fields]
+        query = {"$or": [{old: {"$exists": True}} for old in legacy]}
+        projection = {field: 1 for old, new, _ in fields for field in (old, new)}
+        cleared = kept = 0
+        with BulkWriter(db[col_name]) as writer:
+            cursor = db[col_name].find(query, projection)
+            while batch := list(islice(cursor, 500)):
+                wanted = {ref for doc in batch for _, new, kind in fields for ref in refs_of(doc.get(new), kind)}
+                stored = stored_refs(db, wanted)
+                for doc in batch:
+                    unset = {}
+                    for old, new, kind in fields:
+                        if old not in doc:
+                            continue
+                        refs = refs_of(doc.get(new), kind)
+                        # Empty legacy fields hold nothing to lose
+                        if not doc[old] or (refs and all(ref in stored for ref in refs)):
+                            unset[old] = ""
+                    if len(unset) < len([old for old in legacy if old in doc]):
+                        kept += 1
+                    if unset:
+                        writer.update_one({"_id": doc["_id"]}, {"$unset": unset})
+                        cleared += 1
+        print(f" Migrated images of {cleared} documents in {col_name}"
+              + (f"; {kept} keep base64 fields whose images are not stored (re-run --migrate)" if kept else ""))
+
+    for col_name, fields in UNUSED_FIELDS.items():
+        result = db[col_name].update_many({"$or": [{field: {"$exists": True}} for field in fields]},
+                                          {"$unset": {field: "" for field in fields}})
+        print(f" Dropped unused images of {result.modified_count} documents in {col_name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Content-addressed image store for media_impact_db")
+    parser.add_argument("--migrate", action="store_true", help="move stored base64 images into the image store")
+    args = parser.parse_args()
+
+    # MongoDB connection setup
+    client = MongoClient("uri")  # Replace with your actual MongoDB URI
+    db = client["media_impact_db"]
+
+    if args.migrate:
+        migrate(db)
+    print(f" {db[IMAGES_COLLECTION].count_documents({})} images in the store")
@@ -0,0 +1,77 @@
+from pymongo import MongoClient
+from PIL import Image
+from io import BytesIO
+from mongo_sink import BulkWriter
+from image_store import IMAGES_COLLECTION, get_image, put_variants
+
+# Ingest-time rendering of the images shown by dashboard.py.
+# Logos and player photos are resized to their display size and the PNG/WebP results are
+# kept in the image store next to the originals, so the dashboard does no image work.
+
+# Display sizes used by dashboard.py (.club-logo-emoji is 45px, player photos 120px wide)
+LOGO_SIZE = 45
+PHOTO_WIDTH = 120
+
+# Encode an image in the given format
+def encode_image(img, fmt):
+    buffered = BytesIO()
+    img.save(buffered, format=fmt)
+    return buffered.getvalue()
+
+# Club logo on a transparent canvas, fitted inside a LOGO_SIZE square
+def render_logo(image_bytes):
+    logo_img = Image.open(BytesIO(image_bytes)).convert("RGBA")
+    transparent_background = Image.new("RGBA", logo_img.size, (255, 255, 255, 0))
+    transparent_background.paste(logo_img, mask=logo_img.split()[3])
+    transparent_background.thumbnail((LOGO_SIZE, LOGO_SIZE), Image.LANCZOS)
+    return transparent_background
+
+# Player photo scaled to PHOTO_WIDTH, keeping its aspect ratio
+def render_photo(image_bytes):
+    photo = Image.open(BytesIO(image_bytes)).convert("RGB")
+    height = max(1, round(photo.height * PHOTO_WIDTH / photo.width))
+    return photo.resize((PHOTO_WIDTH, height), Image.LANCZOS)
+
+RENDERERS = {
+    "logo": render_logo,
+    "photo": render_photo,
+}
+
+# Display-size {"png": bytes, "webp": bytes} variants of an image, or None on failure
+def render_variants(image_bytes, kind):
+    if not image_bytes:
+        return None
+    try:
+        img = RENDERERS[kind](image_bytes)
+        return {"png": encode_image(img, "PNG"), "webp": encode_image(img, "WEBP")}
+    except Exception as e:
+        print(f" Error rendering {kind} variants: {e}")
+        return None
+
+# Render variants for every stored logo/photo that does not have them yet
+def backfill(db):
+    targets = [
+        (db["clubs"], "logo_ref", "logo_variant_refs", "logo"),
+        (db["players"], "photo_ref", "photo_variant_refs", "photo"),
+    ]
+    with BulkWriter(db[IMAGES_COLLECTION], verbose=False) as images_writer:
+        for col, original_field, variants_field, kind in targets:
+            query = {original_field: {"$ne": None}, variants_field: {"$exists": False}}
+            count = 0
+            with BulkWriter(col, verbose=False) as writer:
+                for doc in col.find(query, {original_field: 1}):
+                    image = get_image(db, doc[original_field])
+                    variants = render_variants(image[0], kind) if image else None
+                    if variants:
+                        refs = put_variants(images_writer, variants)
+                        writer.update_one({"_id": doc["_id"]}, {"$set": {variants_field: refs}})
+                        count += 1
+                images_writer.flush()  # images land before the references to them
+            print(f" Rendered {kind} variants for {count} documents in {col.name}")
+
+
+if __name__ == "__main__":
+    # MongoDB connection setup
+    client = MongoClient("uri")  # Replace with your actual MongoDB URI
+    db = client["media_impact_db"]
+    backfill(db)
@@ -0,0 +1,57 @@
+import numpy as np
+
+# Vectorized Impact Score shared by club_insights.py and player_insights.py.
+# Each row of the feature matrix is one club/player and each column one feature;
+# all columns are min-max normalized at once and combined with a weight vector.
+
+# Feature columns, in matrix order
+FEATURES = ["sentiment", "positive_sentences", "positive_keywords",
+            "negative_sentences", "negative_keywords", "twitter"]
+
+# Impact = Sentiment + Positive Sentences + Keyword Positives - Negative Sentences - Keyword Negatives
+DEFAULT_WEIGHTS = {
+    "sentiment": 1.0,
+    "positive_sentences": 1.0,
+    "positive_keywords": 1.0,
+    "negative_sentences": -1.0,
+    "negative_keywords": -1.0,
+    "twitter": 0.0
+}
+
+# Output range of each normalized feature (default 1 to 10)
+FEATURE_RANGES = {"twitter": (0, 10)}
+DEFAULT_RANGE = (1, 10)
+
+# Min-max scale each column of X into its (low, high) range.
+# A column where every value is equal maps to its lower bound, like sklearn's MinMaxScaler.
+def min_max(X, low, high):
+    X = np.asarray(X, dtype=float)
+    mins = X.min(axis=0)
+    span = X.max(axis=0) - mins
+    span = np.where(span == 0, 1.0, span)
+    scale = (np.asarray(high, dtype=float) - low) / span
+    return X * scale + (low - mins * scale)
+
+# Normalize a list of values into feature_range; returns a 1-D array
+def normalize(values, feature_range=DEFAULT_RANGE):
+    if len(values) == 0:
+        return np.empty(0)
+    return min_max(np.asarray(values, dtype=float)[:, None], *feature_range)[:, 0]
+
+# Normalize every feature column and compute the weighted impact (0 to 10) in one pass.
+# features: rows of values in `columns` order; weights: overrides of DEFAULT_WEIGHTS.
+# Returns ({column: normalized values}, impact values).
+def score(features, columns=FEATURES, weights=None):
+    X = np.asarray(features, dtype=float).reshape(-1, len(columns))
+    if X.shape[0] == 0:
+        return {c: np.empty(0) for c in columns}, np.empty(0)
+
+    w = {**DEFAULT_WEIGHTS, **(weights or {})}
+    low = np.array([FEATURE_RANGES.get(c, DEFAULT_RANGE)[0] for c in columns], dtype=float)
+    high = np.array([FEATURE_RANGES.get(c, DEFAULT_RANGE)[1] for c in columns], dtype=float)
+    weight_vector = np.array([w.get(c, 0.0) for c in columns], dtype=float)
+
+    norm = min_max(X, low, high)
+    raw = norm @ weight_vector
+    impact = normalize(raw, (0, 10))
+    return {c: norm[:, i] for i, c in enumerate(columns)}, impact
@@ -0,0 +1,48 @@
+from collections import Counter
+
+# Marks the end of a keyword in the trie (tokens are strings, so it never collides)
+END = None
+
+# Keyword lexicons compiled into one trie over tokens, so single-word and multi-word
+# keywords ("goal", "clean sheet", "man of the match") are counted in a single pass over
+# a sentence's tokens. Matches sit on token boundaries, so "goal" does not count inside
+# "goalkeeper", and the longest keyword wins at each position, so "own goal" is counted
+# once as "own goal" and not also as "goal".
+class Lexicon:
+    def __init__(self, lexicons):
+        # lexicons: {label: iterable of keywords}, e.g. {"positive": {...}, "negative": {...}}
+        self.labels = list(lexicons)
+        self.root = {}
+
+        for label, keywords in lexicons.items():
+            for keyword in sorted(keywords):
+                # Keywords are split like the preprocessed tokens: lowercase, on whitespace
+                # (word_tokenize keeps hyphenated words such as "hat-trick" whole)
+                words = keyword.lower().split()
+                if not words:
+                    continue
+                node = self.root
+                for word in words:
+                    node = node.setdefault(word, {})
+                node.setdefault(END, []).append((label, keyword))
+
+    # {label: Counter of keyword -> occurrences} for a list of lowercase tokens
+    def count(self, tokens):
+        counts = {label: Counter() for label in self.labels}
+        i = 0
+        while i < len(tokens):
+            node, match, j = self.root, None, i
+            while j < len(tokens):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                if END in node:
+                    match = (node[END], j)
+            if match is None:
+                i += 1
+                continue
+            keywords, i = match
+            for label, keyword in keywords:
+                counts[label][keyword] += 1
+        return counts
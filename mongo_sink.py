@@ -0,0 +1,95 @@
+import time
+from pymongo import InsertOne, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, PyMongoError
+
+# Buffered write sink shared by the scrapers and insight builders.
+# Operations are queued and sent through one unordered bulk_write once batch_size of them
+# are waiting or flush_interval seconds have passed since the last flush, so hundreds of
+# upserts cost a handful of round trips. Use it as a context manager to flush on exit.
+# Operations are queued as (method, args, kwargs) and turned into pymongo's InsertOne/UpdateOne
+# at flush time. Collections that are not pymongo's own (the in-memory mongomock used by
+# benchmark.py --mongomock, whose bulk API rejects the operations of current pymongo
+# releases) get the same operations one by one through their insert_one/update_one.
+
+# Bulk operation class of each queued method
+BULK_OPS = {
+    "insert_one": InsertOne,
+    "update_one": UpdateOne,
+}
+
+class BulkWriter:
+    def __init__(self, collection, batch_size=500, flush_interval=5.0, verbose=True):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.verbose = verbose
+        self.ops = []
+        self.last_flush = time.monotonic()
+        self.batches = 0
+        self.written = 0
+        self.errors = 0
+        self.total_latency = 0.0
+
+    # Queue an update (e.g. an upsert keyed on the document's natural key)
+    def update_one(self, filter, update, upsert=False):
+        self.add("update_one", (filter, update), {"upsert": upsert})
+
+    # Queue an insert
+    def insert_one(self, document):
+        self.add("insert_one", (document,))
+
+    # Queue one write (a BULK_OPS method and its arguments) and flush if a threshold is reached
+    def add(self, method, args, kwargs=None):
+        self.ops.append((method, args, kwargs or {}))
+        if len(self.ops) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    # Send every queued operation in one unordered bulk_write
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.ops:
+            return
+        ops, self.ops = self.ops, []
+        errors = 0
+        start = time.perf_counter()
+        if isinstance(self.collection, Collection):
+            try:
+                self.collection.bulk_write([BULK_OPS[method](*args, **kwargs) for method, args, kwargs in ops],
+                                           ordered=False)
+            except BulkWriteError as e:
+                # Unordered: every other operation in the batch was still applied
+                errors = len(e.details.get("writeErrors", []))
+                for err in e.details.get("writeErrors", [])[:3]:
+                    print(f" Write error in {self.collection.name}: {err.get('errmsg')}")
+        else:
+            for method, args, kwargs in ops:
+                try:
+                    getattr(self.collection, method)(*args, **kwargs)
+                except PyMongoError as e:
+                    errors += 1
+                    if errors <= 3:
+                        print(f" Write error in {self.collection.name}: {e}")
+        latency = time.perf_counter() - start
+
+        self.batches += 1
+        self.written += len(ops) - errors
+        self.errors += errors
+        self.total_latency += latency
+        if self.verbose:
+            print(f" Flushed {len(ops)} writes to {self.collection.name} in {latency * 1000:.0f} ms ({errors} errors)")
+
+    # One-line summary of everything this sink has written
+    def report(self):
+        avg = 1000 * self.total_latency / self.batches if self.batches else 0
+        return (f" {self.collection.name}: {self.written} writes in {self.batches} batches "
+                f"(avg {avg:.0f} ms/batch, {self.errors} errors)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        if self.verbose:
+            print(self.report())
+        return False
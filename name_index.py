@@ -0,0 +1,99 @@
+import json
+import re
+import unicodedata
+
+# Inverted index from normalized name tokens to players, for attributing video titles and
+# transcript sentences. Names, aliases and texts are all accent-folded and split into word
+# tokens the same way, so "Ødegaard" matches "odegaard" and a name part only matches a
+# whole word ("son" does not match inside "season"). A text is tokenized once and each
+# token is looked up, so the cost grows with the text length rather than the squad size.
+
+# Optional {"Player Name": ["alias", ...]} file of extra names (surnames, nicknames)
+ALIASES_PATH = "player_aliases.json"
+
+# Title matching also accepts single name parts; shorter parts ("de", "ki") are ignored
+MIN_PART_LENGTH = 3
+
+# Letters NFKD does not decompose into a base letter plus an accent
+FOLD_TABLE = str.maketrans({"ø": "o", "đ": "d", "ł": "l", "ı": "i", "ß": "ss", "æ": "ae", "œ": "oe", "þ": "th"})
+
+# Lowercase, accent-free word tokens of a text
+def name_tokens(text):
+    text = unicodedata.normalize("NFKD", text.lower().translate(FOLD_TABLE))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.findall(r"\w+", text)
+
+# Aliases file as {player name: [aliases]}, or {} when there is none
+def load_aliases(path=ALIASES_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+class NameIndex:
+    def __init__(self, player_names, aliases=None):
+        # first token -> [(token tuple, player name)]
+        self.phrases = {}
+        # single name part -> [player names], used for titles only
+        self.parts = {}
+        # Results are returned in player order, as the per-player scan did
+        self.rank = {}
+
+        for name in player_names:
+            if name in self.rank:
+                continue
+            self.rank[name] = len(self.rank)
+            for phrase in [name] + list((aliases or {}).get(name, [])):
+                tokens = tuple(name_tokens(phrase))
+                if tokens:
+                    self.phrases.setdefault(tokens[0], []).append((tokens, name))
+            for part in name_tokens(name):
+                if len(part) >= MIN_PART_LENGTH:
+                    self.parts.setdefault(part, []).append(name)
+
+    def ordered(self, found):
+        return sorted(found, key=self.rank.get)
+
+    # Players whose full name or an alias occurs in the token list
+    def match_phrases(self, tokens):
+        found = set()
+        for i, token in enumerate(tokens):
+            for phrase, name in self.phrases.get(token, ()):
+                if tuple(tokens[i:i + len(phrase)]) == phrase:
+                    found.add(name)
+        return found
+
+    # Players mentioned in a transcript sentence: full name or alias
+    def in_sentence(self, sentence):
+        return self.in_tokens(name_tokens(sentence))
+
+    # Same as in_sentence for a text already split by name_tokens, so several indexes can
+    # be looked up with one tokenization (club_insights.py matches clubs and players)
+    def in_tokens(self, tokens):
+        return self.ordered(self.match_phrases(tokens))
+
+    # Players a video title refers to: full name, alias or any name part
+    def in_title(self, title):
+        tokens = name_tokens(title)
+        found = self.match_phrases(tokens)
+        for token in tokens:
+            found.update(self.parts.get(token, ()))
+        return self.ordered(found)
+
+# Index used by players_in_sentence/players_in_title in this process. It is installed once
+# per pool worker (parallel.nlp_pool(workers, install, (index,))), so mapped tasks only
+# carry their text instead of pickling the whole index with every chunk.
+worker_index = None
+
+def install(index):
+    global worker_index
+    worker_index = index
+
+# Players mentioned in a transcript sentence, by the installed index (runs in pool workers)
+def players_in_sentence(sentence):
+    return worker_index.in_sentence(sentence)
+
+# Players a video title refers to, by the installed index (runs in pool workers)
+def players_in_title(title):
+    return worker_index.in_title(title)
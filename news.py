@@ -1,10 +1,13 @@
 from GoogleNews import GoogleNews
 from newspaper import Article
-import requests
+import asyncio
+import aiohttp
+from concurrent.futures import ThreadPoolExecutor
 from pymongo import MongoClient
-import time
 import unicodedata
-import random
+from rate_governor import governor, host_of, MAX_RETRIES
+from article_registry import ARTICLES_COLLECTION, ArticleRegistry
+from mongo_sink import BulkWriter
 
 # MongoDB connection setup
 mongo = MongoClient("uri")  # Replace with your actual MongoDB URI
@@ -14,6 +17,8 @@ players_col = db["clubs"]  # Note: this should contain club info, not players
 
 # GoogleNews configuration
 googlenews = GoogleNews(lang='en', period='30d')  # Search news from the last 30 days in English
+googlenews.enableException(True)  # raise on HTTP errors so 429s reach the rate governor
+GOOGLE_NEWS_HOST = "news.google.com"
 
 # Function to safely print text with Unicode handling
 def safe_print(text):
@@ -24,20 +29,28 @@ def safe_print(text):
         text_ascii = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
         print(text_ascii)
 
-# Download and parse a full article using headers to avoid 403 errors
-def download_article_with_headers(url):
+# Article fetching: the results of a page are downloaded concurrently, at most
+# FETCH_CONCURRENCY at a time and PER_DOMAIN_LIMIT per site, and parsed in worker threads
+FETCH_CONCURRENCY = 10
+PER_DOMAIN_LIMIT = 2
+FETCH_TIMEOUT = 10  # seconds per article
+PARSE_WORKERS = 4
+
+# Browser headers to avoid 403 errors
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36"
+    )
+}
+
+parse_pool = ThreadPoolExecutor(max_workers=PARSE_WORKERS)
+
+# Parse downloaded HTML into title and text (runs in a parse worker)
+def parse_article(url, html):
     try:
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                "(KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36"
-            )
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
         article = Article(url)
-        article.set_html(response.text)
+        article.set_html(html)
         article.parse()
 
         return {
@@ -45,72 +58,131 @@ def download_article_with_headers(url):
             "text": article.text
         }
 
+    except Exception as e:
+        safe_print(f" Could not parse article: {url}\n{e}")
+        return None
+
+# Download one article (paced per site by the rate governor) and hand its HTML to a parse worker
+async def fetch_article(session, url):
+    host = host_of(url)
+    try:
+        await governor.wait_async(host)
+        async with session.get(url) as response:
+            governor.observe(host, response.status, response.headers)
+            response.raise_for_status()
+            html = await response.text(errors="replace")
     except Exception as e:
         safe_print(f" Could not download full article: {url}\n{e}")
         return None
 
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(parse_pool, parse_article, url, html)
+
+# Fetch the articles of one result page concurrently, stopping once `needed` have text;
+# downloads still in flight at that point are cancelled
+async def fetch_page_articles(session, results, needed):
+    tasks = {}
+    for i, r in enumerate(results):
+        url = r["link"].split("&")[0]
+        tasks[asyncio.create_task(fetch_article(session, url))] = (i, r, url)
+
+    found = []
+    pending = set(tasks)
+    while pending and len(found) < needed:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            article_data = task.result()
+            if article_data and article_data["text"].strip():
+                found.append((tasks[task], article_data))
+
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    # Keep the first `needed` to finish, in the order Google News listed them
+    found = sorted(found[:needed], key=lambda item: item[0][0])
+    return [{
+        "title": article_data["title"],
+        "source": r.get("media", "Unknown"),
+        "date": r.get("date", "Unknown"),
+        "url": url,
+        "text": article_data["text"]
+    } for (i, r, url), article_data in found]
+
+# Run a GoogleNews request paced by the rate governor; a 429 slows the host down and is retried
+async def google_news_call(func, *args):
+    for attempt in range(MAX_RETRIES + 1):
+        await governor.wait_async(GOOGLE_NEWS_HOST)
+        try:
+            result = func(*args)
+        except Exception as e:
+            if "429" in str(e):
+                governor.throttled(GOOGLE_NEWS_HOST)
+                if attempt < MAX_RETRIES:
+                    continue
+            safe_print(f" Google News request failed: {e}")
+            return None
+        governor.success(GOOGLE_NEWS_HOST)
+        return result
+
 # Search and extract articles related to a specific club/player
-def scrape_news(player_name, required_articles=15):
+async def scrape_news_async(player_name, required_articles=15):
     googlenews.clear()
-    googlenews.search(player_name)
+    await google_news_call(googlenews.search, player_name)
 
     articles = []
     page = 1
 
-    while len(articles) < required_articles:
-        results = googlenews.page_at(page)
-        if not results:
-            break
-
-        for r in results:
-            url = r["link"].split("&")[0]
-            article_data = download_article_with_headers(url)
-
-            if article_data and article_data["text"].strip():
-                articles.append({
-                    "title": article_data["title"],
-                    "source": r.get("media", "Unknown"),
-                    "date": r.get("date", "Unknown"),
-                    "url": url,
-                    "text": article_data["text"]
-                })
-
-                if len(articles) >= required_articles:
-                    break
+    timeout = aiohttp.ClientTimeout(total=FETCH_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=FETCH_CONCURRENCY, limit_per_host=PER_DOMAIN_LIMIT)
+    async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout, connector=connector) as session:
+        while len(articles) < required_articles:
+            results = await google_news_call(googlenews.page_at, page)
+            if not results:
+                break
 
-        page += 1
-        # Optional pause between pages to avoid rate limits
-        # time.sleep(random.uniform(3, 6))
+            articles += await fetch_page_articles(session, results, required_articles - len(articles))
+            page += 1
 
     return articles
 
-# Store articles in MongoDB
-def store_news(player_name, articles):
+# Blocking entry point used by the main loop
+def scrape_news(player_name, required_articles=15):
+    return asyncio.run(scrape_news_async(player_name, required_articles))
+
+# Register the articles (each story is stored once) and queue the club's references to them
+def store_news(player_name, articles, news_writer, registry):
     if not articles:
         safe_print(f"No articles found for {player_name}")
         return
 
-    social_data_col.insert_one({
+    article_ids = registry.register_all(articles)
+    registry.flush()  # the articles must be stored before the club document references them
+    news_writer.insert_one({
         "club": player_name,
         "source": "news",
-        "articles_count": len(articles),
-        "articles": articles
+        "articles_count": len(article_ids),
+        "article_ids": article_ids
     })
-    safe_print(f" Stored {len(articles)} articles for {player_name}")
+    safe_print(f" Stored {len(article_ids)} articles for {player_name}")
 
 # Run for all clubs in the database
 players = list(players_col.find())
 
-for player in players:
-    name = player["club_name"]
+# Inserts are buffered and flushed by count or once flush_interval has passed;
+# Google News and article requests are paced by the rate governor
+with BulkWriter(social_data_col) as news_writer, BulkWriter(db[ARTICLES_COLLECTION]) as articles_writer:
+    registry = ArticleRegistry(db, articles_writer)
+    for player in players:
+        name = player["club_name"]
+
+        # Skip if articles for this club are already in the database
+        if social_data_col.count_documents({"club": name, "source": "news"}) > 0:
+            safe_print(f"Skipping {name}, articles already exist.")
+            continue
 
-    # Skip if articles for this club are already in the database
-    if social_data_col.count_documents({"club": name, "source": "news"}) > 0:
-        safe_print(f"Skipping {name}, articles already exist.")
-        continue
+        safe_print(f"\n Searching news for: {name}")
+        articles = scrape_news(name, required_articles=15)
+        store_news(name, articles, news_writer, registry)
 
-    safe_print(f"\n Searching news for: {name}")
-    articles = scrape_news(name, required_articles=15)
-    store_news(name, articles)
-    # Delay between requests
-    time.sleep(random.uniform(30, 60))
+safe_print(registry.report())
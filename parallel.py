@@ -0,0 +1,35 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from nltk.tokenize import sent_tokenize, word_tokenize
+from textblob import TextBlob
+
+# Warm up the lazily loaded NLTK tokenizers and TextBlob lexicon once per worker, then run
+# the caller's own setup (e.g. installing a large lookup table that tasks should not carry)
+def init_nlp_worker(setup=None, setup_args=()):
+    word_tokenize(" ".join(sent_tokenize("Models load once per worker. Then they are reused.")))
+    TextBlob("warm up").sentiment
+    if setup:
+        setup(*setup_args)
+
+# Process pool for NLP work, or None when running serially.
+# `setup(*setup_args)` runs once in every worker when it starts.
+def nlp_pool(workers, setup=None, setup_args=()):
+    if not workers or workers <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, initializer=init_nlp_worker, initargs=(setup, setup_args))
+
+# Map func over items, fanning chunks out to the pool when there is one.
+# Results always come back in input order, so output matches the serial path.
+def map_ordered(pool, func, items, chunksize=64):
+    if pool is None:
+        return [func(item) for item in items]
+    return list(pool.map(func, items, chunksize=chunksize))
+
+# Yield lists of up to size items from any iterable (e.g. a Mongo cursor)
+def batched(iterable, size):
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
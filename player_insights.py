@@ -1,20 +1,21 @@
 from pymongo import MongoClient
-from textblob import TextBlob
 import nltk
+import argparse
+import json
 import unicodedata
-from sklearn.preprocessing import MinMaxScaler
-from collections import Counter
+from sentiment_cache import SentimentCache
+from parallel import nlp_pool, map_ordered, batched
+from lexicon import Lexicon
+import name_index
+from name_index import NameIndex, ALIASES_PATH, load_aliases
+import preprocess
+import impact_scoring
+from aggregates import new_news_stats, load_aggregates, save_aggregates, fold_news, CURSOR_BATCH_SIZE
+from watermarks import get_watermark, set_watermark, reset_watermarks, latest_id, id_range
+from mongo_sink import BulkWriter
 
-# MongoDB setup
-client = MongoClient("uri")
-db = client["media_impact_db"]
-players_col = db["players"]
-articles_col = db["news_data"]
-videos_col = db["youtube_data"]
-insights_col = db["player_insights"]
-
-# Download NLTK resources
-nltk.download("punkt")
+# Name of this stage in the pipeline_state watermarks
+STAGE = "player_insights"
 
 # Safe print
 def safe_print(text):
@@ -44,136 +45,224 @@ negative_keywords = {
     "failed", "trouble", "frustrated", "awkward"
 }
 
-# Load player names
-players = list(players_col.find())
-player_clubs = {p["name"]: p.get("club_name") for p in players}
-player_photos = {p["name"]: p.get("photo_base64") for p in players}
-player_stats = {p["name"]: {"mention_count": 0, "num_videos": 0, "videos": []} for p in players}
-
-
-videos = list(videos_col.find())
-for video in videos:
-    mentioned_in_video = set()
-    transcript = video.get("transcript_text", "")
-    video_id = video.get("video_id")
-    title = video.get("title", "").lower()
-    sentences = nltk.sent_tokenize(transcript)
-
-    for sentence in sentences:
-        lower_sentence = sentence.lower()
-        for name in player_stats:
-            name_parts = name.lower().split()
-            if name in lower_sentence:
-                player_stats[name]["mention_count"] += 1
-                mentioned_in_video.add(name)
-
-    for name in player_stats:
-        name_parts = name.lower().split()
-        if any(part in title for part in name_parts) or name.lower() in title:
-            mentioned_in_video.add(name)
-
-    for name in mentioned_in_video:
-        player_stats[name]["num_videos"] += 1
-        player_stats[name]["videos"].append(str(video_id))
-
-# Analyze articles and combine with YouTube data
-all_players = []
-
-for name in player_clubs:
-    club = player_clubs[name]
-    photo = player_photos[name]
-    record = articles_col.find_one({"player": name, "source": "news"})
-
-    if not record or not record.get("articles"):
-        continue
-
-    texts = [a["text"] for a in record["articles"] if a.get("text")]
-    if not texts:
-        continue
-
-    sentiments = [TextBlob(t).sentiment.polarity for t in texts]
-    avg_sent = sum(sentiments) / len(sentiments)
-
-    pos_sents, neg_sents = [], []
-    for t in texts:
-        for s in nltk.sent_tokenize(t):
-            p = TextBlob(s).sentiment.polarity
-            if p > 0.6:
-                pos_sents.append(s.strip())
-            elif p < -0.6:
-                neg_sents.append(s.strip())
-
-    full_text = " ".join(texts).lower()
-    tokens = nltk.word_tokenize(full_text)
-    pos_kw = Counter([w for w in tokens if w in positive_keywords])
-    neg_kw = Counter([w for w in tokens if w in negative_keywords])
-
-    all_players.append({
+# Both sets compiled once into a matcher that counts single- and multi-word keywords
+keyword_lexicon = Lexicon({"positive": positive_keywords, "negative": negative_keywords})
+
+# Empty running aggregate for one player
+def new_player_record(name):
+    return {
         "name": name,
-        "club": club,
-        "photo_base64": photo,
-        "texts": texts,
-        "avg_sentiment": avg_sent,
-        "count_positive_sentences": len(pos_sents),
-        "count_negative_sentences": len(neg_sents),
-        "positive_keyword_counts": dict(pos_kw),
-        "negative_keyword_counts": dict(neg_kw),
-        "strong_positive_sentences": pos_sents,
-        "strong_negative_sentences": neg_sents,
-        "mention_count": player_stats[name]["mention_count"],
-        "num_videos": player_stats[name]["num_videos"],
-        "videos": player_stats[name]["videos"]
-    })
-
-# Normalize metrics
-def normalize_list_1_10(data):
-    scaler = MinMaxScaler(feature_range=(1, 10))
-    return scaler.fit_transform([[x] for x in data])
-
-sentiments = [p["avg_sentiment"] for p in all_players]
-positive_sent_counts = [p["count_positive_sentences"] for p in all_players]
-positive_kw_counts = [sum(p["positive_keyword_counts"].values()) for p in all_players]
-negative_sent_counts = [p["count_negative_sentences"] for p in all_players]
-negative_kw_counts = [sum(p["negative_keyword_counts"].values()) for p in all_players]
-
-S_norm = normalize_list_1_10(sentiments)
-FP_norm = normalize_list_1_10(positive_sent_counts)
-KP_norm = normalize_list_1_10(positive_kw_counts)
-FN_norm = normalize_list_1_10(negative_sent_counts)
-KN_norm = normalize_list_1_10(negative_kw_counts)
-
-raw_scores = [
-    (S_norm[i][0] + FP_norm[i][0] + KP_norm[i][0] - FN_norm[i][0] - KN_norm[i][0])
-    for i in range(len(all_players))
-]
-
-impact_scaler = MinMaxScaler(feature_range=(0, 10))
-normalized_impact_scores = impact_scaler.fit_transform([[s] for s in raw_scores])
-
-# Save final documents
-for i, player in enumerate(all_players):
-    doc = {
-        "name": player["name"],
-        "club": player["club"],
-        "photo_base64": player["photo_base64"],
-        "num_articles": len(player["texts"]),
-        "avg_sentiment_news": round(player["avg_sentiment"], 3),
-        "normalized_sentiment_news": round(S_norm[i][0], 2),
-        "count_positive_sentences": player["count_positive_sentences"],
-        "count_negative_sentences": player["count_negative_sentences"],
-        "positive_keyword_counts": player["positive_keyword_counts"],
-        "negative_keyword_counts": player["negative_keyword_counts"],
-        "strong_positive_sentences": player["strong_positive_sentences"],
-        "strong_negative_sentences": player["strong_negative_sentences"],
-        "youtube_summary": {
-            "mention_count": player["mention_count"],
-            "num_videos": player["num_videos"],
-            "video_ids": player["videos"]  # list of video _id strings
-        },
-        "impact_score": round(normalized_impact_scores[i][0], 2)
+        "news": new_news_stats(),
+        "youtube": {"mention_count": 0, "num_videos": 0, "videos": []}
     }
 
-    insights_col.update_one({"name": player["name"]}, {"$set": doc}, upsert=True)
-    safe_print(f" Saved insight for {player['name']} ({player['club']})")
+# Fold the videos in (after, upto] (transcript sentences and titles) into the per-player
+# YouTube aggregates, one batch of videos at a time. Players are found through the name
+# index installed in this process and in every pool worker (see run); with a pool the
+# lookups are fanned out in chunks and merged back in order.
+def fold_youtube(db, aggregates, after, upto, pool=None, batch_size=CURSOR_BATCH_SIZE):
+    touched = set()
+    videos = db["youtube_data"].find(
+        id_range(after, upto), {"video_id": 1, "title": 1}).sort("_id", 1).batch_size(batch_size)
+    for videos_batch in batched(videos, batch_size):
+        # Players mentioned in each video's preprocessed transcript sentences; the batch
+        # covers every video in (after, last_id], so its sentences are found by range
+        last_id = videos_batch[-1]["_id"]
+        transcript_mentions = {}
+        transcript_sents = db["sentences"].find(
+            {"source": "youtube_data", **id_range(after, last_id, "source_id")},
+            {"source_id": 1, "lower": 1}).batch_size(batch_size)
+        after = last_id
+        for batch in batched(transcript_sents, 5000):
+            hits = map_ordered(pool, name_index.players_in_sentence,
+                               [sent["lower"] for sent in batch], chunksize=250)
+            for sent, names in zip(batch, hits):
+                for name in names:
+                    aggregates.setdefault(name, new_player_record(name))["youtube"]["mention_count"] += 1
+                    transcript_mentions.setdefault(sent["source_id"], set()).add(name)
+                    touched.add(name)
+
+        title_hits = map_ordered(pool, name_index.players_in_title,
+                                 [video.get("title", "") for video in videos_batch], chunksize=16)
+        for video, names in zip(videos_batch, title_hits):
+            mentioned_in_video = set(transcript_mentions.get(video["_id"], ()))
+            mentioned_in_video.update(names)
+            video_id = video.get("video_id")
+
+            for name in mentioned_in_video:
+                stats = aggregates.setdefault(name, new_player_record(name))["youtube"]
+                stats["num_videos"] += 1
+                stats["videos"].append(str(video_id))
+            touched |= mentioned_in_video
+
+    return touched
+
+# Normalize the aggregates of every player and save the final insight documents
+def finalize(db, aggregates, players, weights=None):
+    # Combine news and YouTube aggregates per player
+    all_players = []
+    for p in {p["name"]: p for p in players}.values():
+        name = p["name"]
+        agg = aggregates.get(name)
+        if not agg or not agg["news"]["num_articles"]:
+            continue
+        news, yt = agg["news"], agg["youtube"]
+
+        all_players.append({
+            "name": name,
+            "club": p.get("club_name"),
+            "photo_ref": p.get("photo_ref"),
+            "photo_variant_refs": p.get("photo_variant_refs"),
+            "num_articles": news["num_articles"],
+            "avg_sentiment": news["sentiment_sum"] / news["num_articles"],
+            "count_positive_sentences": len(news["strong_positive_sentences"]),
+            "count_negative_sentences": len(news["strong_negative_sentences"]),
+            "positive_keyword_counts": news["positive_keyword_counts"],
+            "negative_keyword_counts": news["negative_keyword_counts"],
+            "strong_positive_sentences": news["strong_positive_sentences"],
+            "strong_negative_sentences": news["strong_negative_sentences"],
+            "mention_count": yt["mention_count"],
+            "num_videos": yt["num_videos"],
+            "videos": yt["videos"]
+        })
+
+    if not all_players:
+        return
+
+    # Normalize metrics and combine them into the Impact Score in one vectorized pass
+    columns = ["sentiment", "positive_sentences", "positive_keywords", "negative_sentences", "negative_keywords"]
+    features = [[
+        p["avg_sentiment"],
+        p["count_positive_sentences"],
+        sum(p["positive_keyword_counts"].values()),
+        p["count_negative_sentences"],
+        sum(p["negative_keyword_counts"].values())
+    ] for p in all_players]
+    norm, normalized_impact_scores = impact_scoring.score(features, columns, weights)
+    S_norm = norm["sentiment"]
+
+    # Save final documents in bulk
+    with BulkWriter(db["player_insights"]) as writer:
+        for i, player in enumerate(all_players):
+            doc = {
+                "name": player["name"],
+                "club": player["club"],
+                "photo_ref": player["photo_ref"],
+                "photo_variant_refs": player["photo_variant_refs"],
+                "num_articles": player["num_articles"],
+                "avg_sentiment_news": round(player["avg_sentiment"], 3),
+                "normalized_sentiment_news": round(S_norm[i], 2),
+                "count_positive_sentences": player["count_positive_sentences"],
+                "count_negative_sentences": player["count_negative_sentences"],
+                "positive_keyword_counts": player["positive_keyword_counts"],
+                "negative_keyword_counts": player["negative_keyword_counts"],
+                "strong_positive_sentences": player["strong_positive_sentences"],
+                "strong_negative_sentences": player["strong_negative_sentences"],
+                "youtube_summary": {
+                    "mention_count": player["mention_count"],
+                    "num_videos": player["num_videos"],
+                    "video_ids": player["videos"]  # list of video _id strings
+                },
+                "impact_score": round(normalized_impact_scores[i], 2)
+            }
+
+            writer.update_one({"name": player["name"]}, {"$set": doc}, upsert=True)
+            safe_print(f" Saved insight for {player['name']} ({player['club']})")
+
+# Build player insights; incremental runs only fold in documents added since the last run
+def run(db, sentiment_cache, incremental=False, workers=1, weights=None, aliases=None,
+        batch_size=CURSOR_BATCH_SIZE):
+    aggregates_col = db["player_aggregates"]
+    if not incremental:
+        aggregates_col.delete_many({})
+        reset_watermarks(db, STAGE)
+
+    # Load player names
+    players = list(db["players"].find({}, {"name": 1, "club_name": 1, "photo_ref": 1, "photo_variant_refs": 1}))
+    # Name tokens (and any aliases) indexed once for title and sentence attribution, and
+    # installed here and once in every pool worker
+    index = NameIndex([p["name"] for p in players], aliases)
+    name_index.install(index)
+
+    pool = nlp_pool(workers, name_index.install, (index,))
+    try:
+        touched, watermarks, aggregates = fold_new_documents(db, sentiment_cache, aggregates_col, pool,
+                                                             batch_size)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    save_aggregates(aggregates_col, "name", aggregates, touched)
+    for source, last_id in watermarks.items():
+        set_watermark(db, STAGE, source, last_id)
+    safe_print(f" Folded new documents into {len(touched)} player aggregates")
+
+    finalize(db, aggregates, players, weights)
+
+# Preprocess new texts and fold every document past the watermarks into the aggregates
+def fold_new_documents(db, sentiment_cache, aggregates_col, pool, batch_size=CURSOR_BATCH_SIZE):
+    # news_data documents present now; the articles they reference were registered before
+    # them, so the preprocessing run below covers every one of those articles
+    news_upto = latest_id(db["news_data"])
+
+    # Split and score any new articles/transcripts once; both insight scripts share the result.
+    # Transcripts changed in place are re-split there too, and a full build reads them back.
+    preprocess.run(db, sentiment_cache, pool)
+
+    aggregates = load_aggregates(aggregates_col, "name")
+    touched = set()
+    watermarks = {}
+
+    # New videos are bounded by what the preprocessing stage has already split
+    ranges = {"youtube_data": get_watermark(db, preprocess.STAGE, "youtube_data"), "news_data": news_upto}
+    for source, upto in ranges.items():
+        after = get_watermark(db, STAGE, source)
+        if upto is None or upto == after:
+            continue
+        if source == "youtube_data":
+            touched |= fold_youtube(db, aggregates, after, upto, pool, batch_size)
+        else:
+            touched |= fold_news(db, aggregates, "player", after, upto, keyword_lexicon, new_player_record,
+                                 batch_size)
+        watermarks[source] = upto
+
+    return touched, watermarks, aggregates
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build player insights from News and YouTube data")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only fold in documents added since the last run (new players need a full run)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes for tokenizing, scoring and player attribution")
+    parser.add_argument("--aliases", default=ALIASES_PATH,
+                        help='JSON file of extra player names, e.g. \'{"Heung-min Son": ["sonny"]}\'')
+    parser.add_argument("--prerender-wordclouds", action="store_true",
+                        help="render every keyword cloud into the word cloud cache after the build")
+    parser.add_argument("--weights", type=json.loads, default=None,
+                        help='JSON overrides of the impact weights, e.g. \'{"negative_keywords": -0.5}\'')
+    parser.add_argument("--batch-size", type=int, default=CURSOR_BATCH_SIZE,
+                        help="documents fetched per cursor round trip while folding")
+    args = parser.parse_args()
+
+    # Download NLTK resources
+    nltk.download("punkt")
+
+    # MongoDB setup
+    client = MongoClient("uri")
+    db = client["media_impact_db"]
+
+    # Polarity scores are cached on disk and shared with club_insights.py
+    sentiment_cache = SentimentCache()
+
+    run(db, sentiment_cache, incremental=args.incremental, workers=args.workers,
+        weights=args.weights, aliases=load_aliases(args.aliases), batch_size=args.batch_size)
+
+    # Optional: lay out every word cloud now so dashboard page loads never pay for it
+    if args.prerender_wordclouds:
+        from wordcloud_cache import prerender
+        prerender(db, "player_insights")
 
-safe_print("\n All player insights updated with YouTube and News data.")
+    safe_print("\n All player insights updated with YouTube and News data.")
+    safe_print(sentiment_cache.report())
+    sentiment_cache.close()
@@ -0,0 +1,184 @@
+from pymongo import MongoClient
+import nltk
+import argparse
+from nltk.tokenize import sent_tokenize, word_tokenize
+import unicodedata
+from sentiment_cache import SentimentCache, score_polarity
+from parallel import nlp_pool, map_ordered, batched
+from watermarks import get_watermark, set_watermark, reset_watermarks, latest_id, id_range, content_hash
+
+# Sentence-level preprocessing shared by club_insights.py and player_insights.py.
+# Every unique news article (see article_registry.py) and YouTube transcript is split,
+# tokenized and scored once:
+#   documents: one record per article/transcript with its overall polarity
+#   sentences: one record per sentence (source id, offset, lowercase text, tokens, polarity)
+# The insight scripts aggregate from these collections instead of the raw text.
+# Progress is tracked with a per-source watermark so only new documents are split. Each
+# documents record keeps the content_hash of the text it was split from; sources rewritten
+# in place (a transcript filled in by a later youtube.py re-scrape) carry the hash of their
+# current text, and only the documents whose hashes differ are split again. --full drops
+# every stored record and splits everything again; run it on its own, not next to the
+# insight builders, which read the sentences it deletes.
+
+# Name of this stage in the pipeline_state watermarks
+STAGE = "preprocess"
+
+# Safe print to handle Unicode
+def safe_print(text):
+    try:
+        print(text)
+    except UnicodeEncodeError:
+        print(unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii"))
+
+# Split one text into (sentence, lowercase, tokens) triples; no scoring, so it can run in a worker
+def split_sentences(text):
+    sentences = [s.strip() for s in sent_tokenize(text)]
+    return [(s, s.lower(), word_tokenize(s.lower())) for s in sentences if s]
+
+# Text unit of an articles document; entities are attached later through news_data.article_ids
+def article_units(doc):
+    text = doc.get("text")
+    if text:
+        yield {}, text, True
+
+# Text units of a youtube_data document: the whole transcript
+def youtube_units(doc):
+    text = doc.get("transcript_text")
+    if text:
+        yield {"article": None, "entity_type": None, "entity": None, "video_id": doc.get("video_id")}, text, False
+
+SOURCES = {
+    "articles": article_units,
+    "youtube_data": youtube_units,
+}
+
+# Fields each source's unit function reads; nothing else is fetched
+SOURCE_FIELDS = {
+    "articles": {"text": 1},
+    "youtube_data": {"transcript_text": 1, "video_id": 1},
+}
+
+# Field holding the content_hash of a source's current text, for sources updated in place
+# (articles are content-addressed by article_registry.py and never change)
+CHANGE_FIELDS = {
+    "youtube_data": "transcript_hash",
+}
+
+# Split and score one batch of source documents and store their records
+def process_batch(db, source, units, batch, cache, pool):
+    unit_list = [(doc, meta, text, score_text) for doc in batch for meta, text, score_text in units(doc)]
+    splits = map_ordered(pool, split_sentences, [u[2] for u in unit_list], chunksize=4)
+
+    # Score whole articles and every sentence in one cache lookup; misses go to the pool
+    to_score = [u[2] for u in unit_list if u[3]] + [s[0] for split in splits for s in split]
+    polarities = iter(cache.polarities(to_score, lambda texts: map_ordered(pool, score_polarity, texts)))
+    text_polarities = [next(polarities) if u[3] else None for u in unit_list]
+
+    unit_docs, unit_sents = [], []
+    for (doc, meta, text, score_text), split, text_polarity in zip(unit_list, splits, text_polarities):
+        base = {"source": source, "source_id": doc["_id"], **meta}
+        unit_docs.append({**base, "content_hash": content_hash(text), "polarity": text_polarity,
+                          "num_sentences": len(split)})
+        for offset, (sentence, lower, tokens) in enumerate(split):
+            unit_sents.append({
+                **base,
+                "offset": offset,
+                "text": sentence,
+                "lower": lower,
+                "tokens": tokens,
+                "polarity": next(polarities)
+            })
+
+    if unit_docs:
+        db["documents"].insert_many(unit_docs)
+    if unit_sents:
+        db["sentences"].insert_many(unit_sents)
+    return len(unit_docs), len(unit_sents)
+
+# Split again the already preprocessed documents whose current text hash differs from the
+# one they were split from. The new records are stored before the old ones are deleted, so
+# a concurrent reader never finds a changed document without sentences.
+def resplit_changed(db, source, units, cache, pool, batch_size):
+    field = CHANGE_FIELDS.get(source)
+    upto = get_watermark(db, STAGE, source)
+    if field is None or upto is None:
+        return 0, 0
+
+    split_hashes = {
+        doc["source_id"]: doc.get("content_hash")
+        for doc in db["documents"].find({"source": source}, {"source_id": 1, "content_hash": 1})
+    }
+    changed = [
+        doc["_id"]
+        for doc in db[source].find({**id_range(None, upto), field: {"$ne": None}}, {field: 1})
+        if split_hashes.get(doc["_id"]) != doc[field]
+    ]
+
+    total_docs = total_sents = 0
+    for ids in batched(changed, batch_size):
+        stale = {"source": source, "source_id": {"$in": ids}}
+        stale_docs = [doc["_id"] for doc in db["documents"].find(stale, {"_id": 1})]
+        stale_sents = [sent["_id"] for sent in db["sentences"].find(stale, {"_id": 1})]
+        batch = list(db[source].find({"_id": {"$in": ids}}, SOURCE_FIELDS[source]).sort("_id", 1))
+        n_docs, n_sents = process_batch(db, source, units, batch, cache, pool)
+        total_docs += n_docs
+        total_sents += n_sents
+        if stale_docs:
+            db["documents"].delete_many({"_id": {"$in": stale_docs}})
+        if stale_sents:
+            db["sentences"].delete_many({"_id": {"$in": stale_sents}})
+    return total_docs, total_sents
+
+# Split and score every source document that has not been preprocessed yet, and split again
+# the ones whose text changed since (see resplit_changed).
+# Pass a pool from parallel.nlp_pool() to fan tokenizing and scoring out to worker processes.
+# full=True discards every stored document/sentence record first and splits all sources again;
+# it is only meant for the standalone preprocess.py --full step.
+def run(db, cache, pool=None, batch_size=32, full=False):
+    total_docs = total_sents = 0
+    if full:
+        for source in SOURCES:
+            db["documents"].delete_many({"source": source})
+            db["sentences"].delete_many({"source": source})
+        reset_watermarks(db, STAGE)
+
+    for source, units in SOURCES.items():
+        n_docs, n_sents = resplit_changed(db, source, units, cache, pool, batch_size)
+        total_docs += n_docs
+        total_sents += n_sents
+
+        after = get_watermark(db, STAGE, source)
+        upto = latest_id(db[source])
+        if upto is None or upto == after:
+            continue
+        cursor = db[source].find(id_range(after, upto), SOURCE_FIELDS[source]).sort("_id", 1).batch_size(batch_size)
+        for batch in batched(cursor, batch_size):
+            n_docs, n_sents = process_batch(db, source, units, batch, cache, pool)
+            total_docs += n_docs
+            total_sents += n_sents
+            set_watermark(db, STAGE, source, batch[-1]["_id"])
+        set_watermark(db, STAGE, source, upto)
+
+    safe_print(f" Preprocessed {total_docs} new or changed texts into {total_sents} sentences")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split and score new articles and transcripts")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for tokenizing and scoring")
+    parser.add_argument("--full", action="store_true",
+                        help="drop the stored sentences and split every article and transcript again")
+    args = parser.parse_args()
+
+    nltk.download("punkt")
+    client = MongoClient("uri")  # Replace with your actual MongoDB URI
+    db = client["media_impact_db"]
+
+    sentiment_cache = SentimentCache()
+    pool = nlp_pool(args.workers)
+    try:
+        run(db, sentiment_cache, pool, full=args.full)
+    finally:
+        if pool:
+            pool.shutdown()
+    safe_print(sentiment_cache.report())
+    sentiment_cache.close()
@@ -0,0 +1,192 @@
+import asyncio
+import atexit
+import json
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+
+# Adaptive per-host request pacing shared by the scrapers (AIMD).
+# Each host has a request rate that grows additively after every successful response and
+# is cut multiplicatively on 429/503; Retry-After and rate-limit headers block the host
+# until the server says it is safe again. The learned rates are kept in STATE_PATH so a
+# restarted scraper resumes at the pace it had reached instead of starting over; they are
+# saved on throttle events, every SAVE_INTERVAL seconds and at exit, and each save only
+# writes the hosts this process changed, so scrapers running side by side keep each
+# other's hosts.
+
+STATE_PATH = os.environ.get("RATE_GOVERNOR_STATE", ".rate_governor.json")
+
+# Starting and maximum requests per second per host; MIN_RATE is the floor for every host
+HOST_LIMITS = {
+    "news.google.com": {"initial": 1 / 45, "max": 1 / 5},
+    "www.transfermarkt.co.uk": {"initial": 0.5, "max": 2.0},
+}
+DEFAULT_LIMITS = {"initial": 1.0, "max": 4.0}
+MIN_RATE = 1 / 3600
+
+# Additive step (as a fraction of the host's initial rate) and multiplicative cut
+INCREASE = 0.1
+DECREASE = 0.5
+
+# Seconds between saves of the learned rates while requests succeed
+SAVE_INTERVAL = 60.0
+
+# Responses that mean "slow down", and how often a throttled request is retried
+THROTTLE_STATUSES = (429, 503)
+MAX_RETRIES = 3
+
+# Host part of a URL, used as the pacing key
+def host_of(url):
+    return urlsplit(url).hostname or url
+
+# Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+# Seconds until the quota resets when rate-limit headers say none is left, or None
+def parse_rate_limit(headers):
+    remaining = headers.get("x-ratelimit-remaining", headers.get("x-rate-limit-remaining"))
+    reset = headers.get("x-ratelimit-reset", headers.get("x-rate-limit-reset"))
+    try:
+        if remaining is None or int(float(remaining)) > 0 or reset is None:
+            return None
+        reset = float(reset)
+    except ValueError:
+        return None
+    # Either an epoch timestamp (Twitter, GitHub) or seconds until the reset
+    return max(0.0, reset - time.time()) if reset > 1e9 else reset
+
+class RateGovernor:
+    def __init__(self, path=STATE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        # Serializes saves; held for the file I/O only, never while pacing requests
+        self.save_lock = threading.Lock()
+        self.hosts = self.load()
+        # Hosts changed since the last save
+        self.dirty = set()
+        self.last_save = time.monotonic()
+        atexit.register(self.save)
+
+    # Host states stored in the state file ({} if there is none)
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def limits(self, host):
+        return HOST_LIMITS.get(host, DEFAULT_LIMITS)
+
+    # {"rate": requests/second, "next_allowed": epoch seconds} of a host
+    def state(self, host):
+        if host not in self.hosts:
+            self.hosts[host] = {"rate": self.limits(host)["initial"], "next_allowed": 0.0}
+        return self.hosts[host]
+
+    # Write the hosts changed since the last save over the file's current contents
+    def save(self):
+        with self.lock:
+            changed = {host: dict(self.hosts[host]) for host in self.dirty}
+            self.dirty.clear()
+            self.last_save = time.monotonic()
+        if not changed:
+            return
+        with self.save_lock:
+            hosts = self.load()
+            hosts.update(changed)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(hosts, f, indent=1)
+            os.replace(tmp_path, self.path)
+
+    # Save if SAVE_INTERVAL seconds have passed since the last save
+    def save_if_due(self):
+        if time.monotonic() - self.last_save >= SAVE_INTERVAL:
+            self.save()
+
+    # Reserve the next request slot for a host and return how long to wait for it
+    def reserve(self, host):
+        with self.lock:
+            state = self.state(host)
+            now = time.time()
+            start = max(now, state["next_allowed"])
+            state["next_allowed"] = start + 1 / state["rate"]
+            return start - now
+
+    # Block until the host may be called again
+    def wait(self, host):
+        delay = self.reserve(host)
+        if delay > 0:
+            print(f" Rate governor: waiting {delay:.1f}s for {host}")
+            time.sleep(delay)
+
+    # Same as wait, for coroutines
+    async def wait_async(self, host):
+        delay = self.reserve(host)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    # Additive increase after a successful response
+    def success(self, host):
+        with self.lock:
+            state = self.state(host)
+            limits = self.limits(host)
+            state["rate"] = min(limits["max"], state["rate"] + INCREASE * limits["initial"])
+            self.dirty.add(host)
+        self.save_if_due()
+
+    # Multiplicative decrease, and no request before `block_for` seconds (if given)
+    def throttled(self, host, block_for=None):
+        with self.lock:
+            state = self.state(host)
+            state["rate"] = max(MIN_RATE, state["rate"] * DECREASE)
+            pause = block_for if block_for is not None else 1 / state["rate"]
+            state["next_allowed"] = max(state["next_allowed"], time.time() + pause)
+            self.dirty.add(host)
+        self.save()
+        print(f" Rate governor: {host} throttled, now {state['rate']:.4f} req/s, paused {pause:.0f}s")
+
+    # Update a host's pace from a response status code and headers
+    def observe(self, host, status, headers=None):
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        if status in THROTTLE_STATUSES:
+            self.throttled(host, parse_retry_after(headers.get("retry-after")) or parse_rate_limit(headers))
+            return
+        if status < 400:
+            self.success(host)
+        # Quota exhausted without being throttled yet: hold off until it resets
+        exhausted_for = parse_rate_limit(headers)
+        if exhausted_for:
+            with self.lock:
+                state = self.state(host)
+                state["next_allowed"] = max(state["next_allowed"], time.time() + exhausted_for)
+                self.dirty.add(host)
+            self.save()
+
+    # Paced GET that retries throttled responses after the governor's pause
+    def get(self, url, session=None, retries=MAX_RETRIES, **kwargs):
+        host = host_of(url)
+        http = session or requests
+        for attempt in range(retries + 1):
+            self.wait(host)
+            response = http.get(url, **kwargs)
+            self.observe(host, response.status_code, response.headers)
+            if response.status_code not in THROTTLE_STATUSES or attempt == retries:
+                return response
+
+# Process-wide governor used by the scrapers
+governor = RateGovernor()
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import sqlite3
+import time
+import unicodedata
+from textblob import TextBlob
+
+# Default cache location, shared by club_insights.py and player_insights.py
+CACHE_PATH = os.environ.get("SENTIMENT_CACHE_PATH", "sentiment_cache.sqlite")
+MAX_ENTRIES = int(os.environ.get("SENTIMENT_CACHE_MAX_ENTRIES", "1000000"))
+
+# SQLite caps the number of bound parameters per statement
+BATCH = 500
+
+# Normalize text so trivial whitespace/Unicode differences share one cache entry
+def normalize_text(text):
+    text = unicodedata.normalize("NFKC", text or "")
+    return " ".join(text.split())
+
+# TextBlob polarity of one text (module-level so process pools can pickle it)
+def score_polarity(text):
+    return TextBlob(text).sentiment.polarity
+
+# Content address of a text: SHA-1 of its normalized form
+def text_key(text):
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+# Persistent TextBlob polarity cache keyed by text hash, with LRU eviction
+class SentimentCache:
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS polarity ("
+            " key TEXT PRIMARY KEY, value REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS polarity_last_used ON polarity(last_used)")
+        self.conn.commit()
+
+    # Look up many keys at once; returns {key: polarity} for the ones present
+    def get_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for i in range(0, len(keys), BATCH):
+            chunk = keys[i:i + BATCH]
+            marks = ",".join("?" * len(chunk))
+            rows = self.conn.execute(f"SELECT key, value FROM polarity WHERE key IN ({marks})", chunk)
+            found.update(rows.fetchall())
+        if found:
+            now = time.time()
+            self.conn.executemany("UPDATE polarity SET last_used = ? WHERE key = ?",
+                                  [(now, k) for k in found])
+            self.conn.commit()
+        return found
+
+    # Store many {key: polarity} pairs, then evict the least recently used overflow
+    def put_many(self, values):
+        if not values:
+            return
+        now = time.time()
+        self.conn.executemany("INSERT OR REPLACE INTO polarity (key, value, last_used) VALUES (?, ?, ?)",
+                              [(k, v, now) for k, v in values.items()])
+        self.conn.commit()
+        self.evict()
+
+    # Drop the oldest entries once the cache grows past max_entries
+    def evict(self):
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM polarity").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute("DELETE FROM polarity WHERE key IN ("
+                              " SELECT key FROM polarity ORDER BY last_used LIMIT ?)", (excess,))
+            self.conn.commit()
+
+    # Polarity for each text, scoring only the ones never seen before.
+    # score_many(list_of_texts) can be swapped in to score the misses elsewhere (e.g. a process pool)
+    def polarities(self, texts, score_many=None):
+        keys = [text_key(t) for t in texts]
+        cached = self.get_many(keys)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key in cached or key in missing:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing[key] = text
+        if score_many is None:
+            score_many = lambda batch: [score_polarity(t) for t in batch]
+        fresh = dict(zip(missing, score_many(list(missing.values()))))
+        self.put_many(fresh)
+        cached.update(fresh)
+        return [cached[k] for k in keys]
+
+    # Polarity for a single text
+    def polarity(self, text):
+        return self.polarities([text])[0]
+
+    # One-line hit/miss summary for the end of a run
+    def report(self):
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0
+        return f"Sentiment cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate)"
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,164 @@
+from bs4 import BeautifulSoup
+from pymongo import MongoClient
+from PIL import Image
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+from http_cache import fetch
+from image_variants import render_variants
+from image_store import IMAGES_COLLECTION, put_image, put_variants, stored_refs
+from mongo_sink import BulkWriter
+
+# Single-pass squad ingestion (replaces running players.py and then players_photos.py).
+# Each Transfermarkt squad page is fetched and parsed once: player metadata is upserted in
+# bulk and the photo URLs of players without a stored photo are handed to a bounded pool of
+# download threads. Which players already have a photo is read once up front.
+
+BASE_URL = "https://www.transfermarkt.co.uk"
+PHOTO_WORKERS = 4
+
+# Function to download an image from a URL as JPEG bytes
+def image_to_jpeg(url):
+    try:
+        response = fetch(url, timeout=10)
+        response.raise_for_status()
+        img = Image.open(BytesIO(response.content)).convert("RGB")  # Convert to RGB to avoid format issues
+        buffered = BytesIO()
+        img.save(buffered, format="JPEG")  # Save image to memory buffer in JPEG format
+        return buffered.getvalue()
+    except Exception as e:
+        print(f" Error downloading image: {e}")
+        return None
+
+# Photo bytes and its 120px display variants (runs in a download thread)
+def download_photo(photo_url):
+    photo_jpeg = image_to_jpeg(photo_url)
+    if not photo_jpeg:
+        return None
+    return photo_jpeg, render_variants(photo_jpeg, "photo")
+
+# Metadata and photo URL of every player row in a squad page
+def parse_squad(html, club_name):
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find("table", class_="items")
+    if not table:
+        return None
+
+    players = []
+    for row in table.find("tbody").find_all("tr", class_=["odd", "even"]):
+        try:
+            name_tag = row.select_one("td.hauptlink a")
+            if not name_tag:
+                continue
+
+            name = name_tag.text.strip()
+            tds = row.find_all("td")
+            img_tag = row.select_one("img.bilderrahmen-fixed")
+
+            players.append({
+                "name": name,
+                "profile_url": BASE_URL + name_tag["href"],
+                "position": row.find_all("tr")[-1].text.strip() if row.find("tr") else None,
+                "age": tds[4].text.strip() if len(tds) > 4 else None,
+                "market_value": tds[-1].text.strip() if tds[-1] else None,
+                "club_name": club_name,
+                "photo_url": img_tag.get("data-src") or img_tag.get("src") if img_tag else None
+            })
+        except Exception as e:
+            print(f" Error parsing player row: {e}")
+    return players
+
+# Store finished downloads and queue the photo references; wait=True blocks until all are done.
+# The photos are flushed to the image store before their references are queued, so players
+# never reference an image that is not stored yet; if a photo write failed, the references
+# are left out and the next run downloads those photos again.
+def drain_photos(pending, writer, images_writer, wait=False):
+    still_pending, stored = [], []
+    errors = images_writer.errors
+    for key, future in pending:
+        if not wait and not future.done():
+            still_pending.append((key, future))
+            continue
+        name, club_name = key
+        photo = future.result()
+        if photo:
+            photo_jpeg, variants = photo
+            stored.append((key, {
+                "photo_ref": put_image(images_writer, photo_jpeg, "image/jpeg"),
+                "photo_variant_refs": put_variants(images_writer, variants)
+            }))
+        else:
+            print(f" No image found for {name}".encode("ascii", errors="ignore").decode())
+
+    if not stored:
+        return still_pending
+    images_writer.flush()
+    if images_writer.errors != errors:
+        print(f" Photo writes failed; {len(stored)} photo references not updated (the next run downloads them again)")
+        return still_pending
+    for (name, club_name), refs in stored:
+        # Upsert so the update lands even if it is applied before the metadata upsert
+        writer.update_one({"name": name, "club_name": club_name}, {"$set": refs}, upsert=True)
+        print(f" Photo updated for {name}".encode("ascii", errors="ignore").decode())
+    return still_pending
+
+# Ingest every club's squad: metadata upserts and/or missing photos
+def ingest(db, metadata=True, photos=True, workers=PHOTO_WORKERS):
+    clubs = list(db["clubs"].find({}, {"club_name": 1, "squad_url": 1}))
+    players_col = db["players"]
+
+    # Players already stored, and those whose photo is in the image store, read once (a
+    # photo_ref whose image was never stored does not count, so that photo is fetched again)
+    key_projection = {"_id": 0, "name": 1, "club_name": 1}
+    known = {(p["name"], p["club_name"]) for p in players_col.find({}, key_projection)}
+    photo_refs = {(p["name"], p["club_name"]): p["photo_ref"]
+                  for p in players_col.find({"photo_ref": {"$ne": None}}, {**key_projection, "photo_ref": 1})}
+    stored = stored_refs(db, photo_refs.values())
+    have_photo = {key for key, ref in photo_refs.items() if ref in stored}
+    print(f"\n Ingesting squads for {len(clubs)} clubs ({len(have_photo)} players already have photos)...")
+
+    pending = []
+    with BulkWriter(players_col) as writer, BulkWriter(db[IMAGES_COLLECTION]) as images_writer, \
+            ThreadPoolExecutor(max_workers=workers) as downloader:
+        for club in clubs:
+            club_name = club["club_name"]
+            print(f"\n Accessing squad for {club_name}")
+            try:
+                res = fetch(club["squad_url"])
+                res.raise_for_status()
+                squad = parse_squad(res.text, club_name)
+            except Exception as e:
+                print(f" Error fetching squad for {club_name}: {e}")
+                continue
+            if squad is None:
+                print(f" No player table found for {club_name}")
+                continue
+            print(f" Found {len(squad)} player rows")
+
+            for player in squad:
+                key = (player["name"], club_name)
+                photo_url = player.pop("photo_url")
+                if metadata:
+                    writer.update_one({"name": player["name"], "club_name": club_name},
+                                      {"$set": player}, upsert=True)
+                    known.add(key)
+                # Photos are only fetched for stored players that do not have one yet
+                if photos and photo_url and key in known and key not in have_photo:
+                    have_photo.add(key)
+                    pending.append((key, downloader.submit(download_photo, photo_url)))
+
+            pending = drain_photos(pending, writer, images_writer)
+        drain_photos(pending, writer, images_writer, wait=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape Transfermarkt squads: player metadata and photos in one pass")
+    parser.add_argument("--metadata-only", action="store_true", help="do not download photos")
+    parser.add_argument("--photos-only", action="store_true", help="only download missing photos of stored players")
+    parser.add_argument("--workers", type=int, default=PHOTO_WORKERS, help="parallel photo downloads")
+    args = parser.parse_args()
+
+    # MongoDB connection setup
+    client = MongoClient("uri")  # Replace with your actual MongoDB URI
+    db = client["media_impact_db"]
+    ingest(db, metadata=not args.photos_only, photos=not args.metadata_only, workers=args.workers)
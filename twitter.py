@@ -1,11 +1,21 @@
 import tweepy
+import requests
 from pymongo import MongoClient
 from datetime import datetime
-import time
+from twitter_tokens import TokenScheduler, load_tokens
+from mongo_sink import BulkWriter
 
-# Twitter API setup
-BEARER_TOKEN = ""  # Replace with your actual bearer token
-client = tweepy.Client(bearer_token=BEARER_TOKEN)
+# Twitter API setup: every bearer token in token.txt (blank-line separated) is used,
+# each within its own rate-limit window
+BEARER_TOKEN = ""  # Optional extra bearer token
+tokens = load_tokens() + ([BEARER_TOKEN] if BEARER_TOKEN else [])
+scheduler = TokenScheduler(tokens)
+# Raw responses, so the rate-limit headers can be read
+clients = {tid: tweepy.Client(bearer_token=token, return_type=requests.Response)
+           for tid, token in scheduler.tokens.items()}
+
+# Attempts per entity beyond one per token (a 429 moves on to the next token)
+MAX_RETRIES = 3
 
 # MongoDB setup
 mongo = MongoClient("uri0")  # Replace with your actual MongoDB URI
@@ -19,20 +29,38 @@ def search_tweets_for_entity(name, max_results=20):
     tweets_data = []
 
     try:
-        response = client.search_recent_tweets(
-            query=query,
-            max_results=max_results,
-            tweet_fields=["created_at", "author_id", "text", "lang"]
-        )
-        tweets = response.data
+        # Use the token available soonest; a 429 marks it exhausted and a 401/403 marks it
+        # dead, and either way the next token is tried
+        attempts = len(scheduler.tokens) + MAX_RETRIES
+        for attempt in range(attempts):
+            tid, _ = scheduler.acquire()
+            try:
+                response = clients[tid].search_recent_tweets(
+                    query=query,
+                    max_results=max_results,
+                    tweet_fields=["created_at", "author_id", "text", "lang"]
+                )
+                scheduler.update(tid, response.headers)
+                break
+            except tweepy.TooManyRequests as e:
+                scheduler.exhausted(tid, e.response.headers)
+                if attempt == attempts - 1:
+                    raise
+            except (tweepy.Unauthorized, tweepy.Forbidden):
+                # Revoked or invalid token: never pick it again
+                scheduler.dead(tid)
+                if attempt == attempts - 1:
+                    raise
+        tweets = response.json().get("data")
         if not tweets:
             return []
 
         for tweet in tweets:
+            created_at = datetime.strptime(tweet["created_at"], "%Y-%m-%dT%H:%M:%S.%fZ")
             tweets_data.append({
-                "date": tweet.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                "author_id": tweet.author_id,
-                "content": tweet.text
+                "date": created_at.strftime("%Y-%m-%d %H:%M:%S"),
+                "author_id": int(tweet["author_id"]),
+                "content": tweet["text"]
             })
 
     except Exception as e:
@@ -40,13 +68,13 @@ def search_tweets_for_entity(name, max_results=20):
 
     return tweets_data
 
-# Function to store tweet data in MongoDB
-def store_twitter_data(entity_name, tweets):
+# Function to queue tweet data for MongoDB; the writer inserts it in bulk
+def store_twitter_data(entity_name, tweets, twitter_writer):
     if not tweets:
         print(f" No tweets found for {entity_name}")
         return False
 
-    twitter_col.insert_one({
+    twitter_writer.insert_one({
         "entity": entity_name,
         "source": "twitter",
         "mention_count": len(tweets),
@@ -59,19 +87,20 @@ def store_twitter_data(entity_name, tweets):
 # Main loop: go through all clubs in the database
 clubs = list(clubs_col.find())
 
-for club in clubs:
-    name = club["club_name"]
+# Inserts are buffered and written in bulk
+with BulkWriter(twitter_col) as twitter_writer:
+    for club in clubs:
+        name = club["club_name"]
 
-    # Check if tweets for this club are already in the database
-    existing = twitter_col.find_one({"entity": name})
-    if existing:
-        print(f" Skipping {name} (already exists in DB)")
-        continue
+        # Check if tweets for this club are already in the database
+        existing = twitter_col.find_one({"entity": name})
+        if existing:
+            print(f" Skipping {name} (already exists in DB)")
+            continue
 
-    print(f" Searching tweets for: {name}")
-    tweets = search_tweets_for_entity(name, max_results=20)
-    inserted = store_twitter_data(name, tweets)
+        print(f" Searching tweets for: {name}")
+        tweets = search_tweets_for_entity(name, max_results=20)
+        inserted = store_twitter_data(name, tweets, twitter_writer)
 
-    if inserted:
-        print(" Waiting 15 minutes before next request...")
-        time.sleep(900)  # Wait 15 minutes to comply with Twitter rate limits
+        if inserted:
+            twitter_writer.flush()  # persist before a possible wait for quota
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import re
+import time
+
+# Multi-token scheduling for twitter.py.
+# Every bearer token in token.txt has its own rate-limit window. The scheduler records each
+# token's remaining quota and reset time from the x-rate-limit-* response headers, hands
+# out whichever token can be used soonest and only sleeps when all of them are exhausted,
+# until the earliest reset. Quota state is kept on disk (keyed by a hash of the token, so
+# no secret is written) and survives restarts.
+
+TOKENS_PATH = "token.txt"
+STATE_PATH = os.environ.get("TWITTER_TOKEN_STATE", ".twitter_tokens.json")
+
+# Assumed window when a 429 carries no reset header (Twitter windows are 15 minutes)
+DEFAULT_WINDOW = 15 * 60
+
+# Characters of a bearer token; anything else (a URI with "://" or "user:pw@", spaces,
+# notes) is another credential or text and must never be sent to the Twitter API
+BEARER_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9%._~+/=-]+")
+
+# Bearer tokens of a token.txt file, one per blank-line-separated block
+def load_tokens(path=TOKENS_PATH):
+    try:
+        with open(path) as f:
+            blocks = f.read().split("\n\n")
+    except OSError:
+        return []
+    tokens = []
+    skipped = 0
+    for block in blocks:
+        token = block.strip()
+        if not token:
+            continue
+        if not BEARER_TOKEN_PATTERN.fullmatch(token):
+            skipped += 1
+            continue
+        if token not in tokens:
+            tokens.append(token)
+    if skipped:
+        print(f" Ignored {skipped} block(s) of {path} that are not bearer tokens")
+    return tokens
+
+# Stable, non-secret identifier of a token
+def token_id(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+class TokenScheduler:
+    def __init__(self, tokens, path=STATE_PATH):
+        self.path = path
+        self.tokens = {token_id(token): token for token in tokens}
+        self.state = {}
+        try:
+            with open(path) as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def is_dead(self, tid):
+        return self.state.get(tid, {}).get("dead", False)
+
+    # Epoch time from which a token can be used (now if it has quota or its window has reset)
+    def available_at(self, tid):
+        quota = self.state.get(tid)
+        if quota and quota.get("dead"):
+            return float("inf")
+        if not quota or quota["remaining"] > 0 or time.time() >= quota["reset"]:
+            return 0.0
+        return quota["reset"]
+
+    # Token usable soonest (most remaining quota first), sleeping until its reset if needed
+    def acquire(self):
+        live = [tid for tid in self.tokens if not self.is_dead(tid)]
+        if not live:
+            raise RuntimeError(f"None of the {len(self.tokens)} bearer tokens is accepted by the API")
+
+        def priority(tid):
+            quota = self.state.get(tid)
+            remaining = quota["remaining"] if quota and time.time() < quota["reset"] else float("inf")
+            return (self.available_at(tid), -remaining)
+
+        tid = min(live, key=priority)
+        delay = self.available_at(tid) - time.time()
+        if delay > 0:
+            print(f" All {len(live)} tokens exhausted, sleeping {delay:.0f}s until the earliest reset")
+            time.sleep(delay)
+        return tid, self.tokens[tid]
+
+    # Record the quota reported by a response's rate-limit headers
+    def update(self, tid, headers):
+        remaining = headers.get("x-rate-limit-remaining")
+        reset = headers.get("x-rate-limit-reset")
+        if remaining is None or reset is None:
+            return
+        self.state[tid] = {"remaining": int(remaining), "reset": float(reset)}
+        self.save()
+
+    # Mark a token as exhausted after a 429, until the reset in its headers
+    def exhausted(self, tid, headers):
+        reset = headers.get("x-rate-limit-reset")
+        self.state[tid] = {"remaining": 0, "reset": float(reset) if reset else time.time() + DEFAULT_WINDOW}
+        self.save()
+
+    # Mark a token rejected by the API (401/403) as unusable; it stays skipped until replaced
+    def dead(self, tid):
+        self.state[tid] = {"remaining": 0, "reset": 0.0, "dead": True}
+        self.save()
+        print(f" Token {tid} was rejected by the API and will be skipped")
@@ -0,0 +1,46 @@
+import hashlib
+from datetime import datetime
+
+# Per-stage, per-source watermarks stored in the pipeline_state collection.
+# A watermark is the last source _id a stage has folded in; ObjectIds grow with
+# insertion time, so everything after it is new since the previous run.
+STATE_COLLECTION = "pipeline_state"
+
+# Last processed _id of a source collection for one stage (None if never run)
+def get_watermark(db, stage, source):
+    doc = db[STATE_COLLECTION].find_one({"_id": f"{stage}:{source}"})
+    return doc["last_id"] if doc else None
+
+# Record the last processed _id of a source collection for one stage
+def set_watermark(db, stage, source, last_id):
+    if last_id is None:
+        return
+    db[STATE_COLLECTION].update_one(
+        {"_id": f"{stage}:{source}"},
+        {"$set": {"stage": stage, "source": source, "last_id": last_id,
+                  "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}},
+        upsert=True
+    )
+
+# Forget every watermark of a stage so the next run starts from scratch
+def reset_watermarks(db, stage):
+    db[STATE_COLLECTION].delete_many({"stage": stage})
+
+# Newest _id currently in a collection (None if it is empty)
+def latest_id(col):
+    doc = col.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    return doc["_id"] if doc else None
+
+# Filter for documents after one watermark and up to (and including) another.
+# `field` selects what is compared, e.g. "source_id" to find the sentences of a source range.
+def id_range(after, upto, field="_id"):
+    rng = {"$lte": upto}
+    if after is not None:
+        rng["$gt"] = after
+    return {field: rng}
+
+# Content hash of a source text. Scrapers store it next to text they may rewrite in place
+# (e.g. youtube_data.transcript_hash) and stages compare it with the hash they last
+# processed, so a changed document can be redone without rescanning every text.
+def content_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest() if text else None
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import threading
+from io import BytesIO
+from wordcloud import WordCloud
+
+# Disk-backed word cloud renderer shared by dashboard.py and the insight builders.
+# A cloud is identified by a digest of its keyword counts and render options; the PNG
+# is laid out once, kept in an LRU directory and served from there afterwards.
+
+CACHE_DIR = os.environ.get("WORDCLOUD_CACHE_DIR", os.path.join(".cache", "wordclouds"))
+MAX_FILES = int(os.environ.get("WORDCLOUD_CACHE_MAX_FILES", "2000"))
+
+# Render options used by the dashboard
+WIDTH = 600
+HEIGHT = 300
+POSITIVE_COLORMAP = "Greens"
+NEGATIVE_COLORMAP = "Reds"
+
+# Cache key: digest of the keyword counts plus every render option
+def cloud_key(frequencies, colormap, width=WIDTH, height=HEIGHT):
+    payload = json.dumps({
+        "frequencies": sorted(frequencies.items()),
+        "colormap": colormap,
+        "size": [width, height]
+    })
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# Keep only the max_files most recently used PNGs in the cache directory
+def evict(cache_dir=CACHE_DIR, max_files=MAX_FILES):
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if not entry.name.endswith(".png"):
+            continue
+        try:
+            entries.append((entry.stat().st_mtime, entry))
+        except OSError:  # evicted by another thread meanwhile
+            pass
+    if len(entries) <= max_files:
+        return
+    entries.sort(key=lambda e: e[0])
+    for _, entry in entries[:len(entries) - max_files]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+# PNG bytes of a word cloud, rendered once and then served from the disk cache
+def render_wordcloud(frequencies, colormap, width=WIDTH, height=HEIGHT, cache_dir=CACHE_DIR):
+    path = os.path.join(cache_dir, cloud_key(frequencies, colormap, width, height) + ".png")
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)  # mark as recently used
+        return data
+    except OSError:
+        pass
+
+    wc = WordCloud(width=width, height=height, background_color="white", colormap=colormap)
+    wc.generate_from_frequencies(dict(frequencies))
+    buffered = BytesIO()
+    wc.to_image().save(buffered, format="PNG")
+    data = buffered.getvalue()
+
+    # Write to a temp file first so concurrent readers never see a partial PNG; the name is
+    # per thread because Streamlit renders every session on a thread of the same process
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    evict(cache_dir)
+    return data
+
+# Pre-render the positive and negative clouds of every document in an insights collection
+def prerender(db, collection):
+    count = 0
+    projection = {"positive_keyword_counts": 1, "negative_keyword_counts": 1}
+    for doc in db[collection].find({}, projection):
+        for field, colormap in (("positive_keyword_counts", POSITIVE_COLORMAP),
+                                ("negative_keyword_counts", NEGATIVE_COLORMAP)):
+            if doc.get(field):
+                render_wordcloud(doc[field], colormap)
+                count += 1
+    print(f" Pre-rendered {count} word clouds for {collection}")
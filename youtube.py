@@ -1,29 +1,19 @@
 import yt_dlp
 from youtube_transcript_api import YouTubeTranscriptApi
 from pymongo import MongoClient
-from PIL import Image
-from io import BytesIO
-import base64
-import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
+import json
+import os
+import threading
+from mongo_sink import BulkWriter
+from watermarks import content_hash
 
 # MongoDB setup
 client = MongoClient("uri")
 db = client["media_impact_db"]
 youtube_col = db["youtube_data"]
 
-# Convertir thumbnail a base64
-def image_to_base64_from_url(url):
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        img = Image.open(BytesIO(response.content)).convert("RGB")
-        buffered = BytesIO()
-        img.save(buffered, format="JPEG")
-        return base64.b64encode(buffered.getvalue()).decode("utf-8")
-    except Exception as e:
-        print(f"Error processing thumbnail: {e}")
-        return None
-
 # Obtener transcripción
 def get_transcript(video_id):
     try:
@@ -42,47 +32,119 @@ ydl_opts = {
     'force_generic_extractor': True,
 }
 
-with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-    playlist_info = ydl.extract_info(playlist_url, download=False)
-    videos = playlist_info.get("entries", [])
-    print(f"Found {len(videos)} videos in the playlist.")
+# Videos are processed by a pool of threads; progress is checkpointed every CHECKPOINT videos
+WORKERS = 4
+CHECKPOINT = 20
+PROGRESS_PATH = "youtube_progress.json"
+
+# Un YoutubeDL por hilo (no es seguro compartirlo entre hilos)
+thread_state = threading.local()
+
+def get_ydl():
+    if not hasattr(thread_state, "ydl"):
+        thread_state.ydl = yt_dlp.YoutubeDL(ydl_opts)
+    return thread_state.ydl
 
-    for video in videos:
+# Metadatos y transcripción de un vídeo (se ejecuta en un hilo del pool); el dashboard
+# carga las miniaturas directamente del CDN de YouTube, así que no se descargan
+def fetch_video(video_id):
+    video_url = f"https://www.youtube.com/watch?v={video_id}"
+
+    # Extraer info detallada del vídeo
+    video_info = get_ydl().extract_info(video_url, download=False)
+
+    publish_date = video_info.get("upload_date")  # formato YYYYMMDD
+    # Formatear fecha
+    publish_date = f"{publish_date[:4]}-{publish_date[4:6]}-{publish_date[6:]}" if publish_date else None
+
+    transcript = get_transcript(video_id)
+    doc = {
+        "video_id": video_id,
+        "video_url": video_url,
+        "title": video_info.get("title"),
+        "publish_date": publish_date,
+        "channel": video_info.get("channel"),
+        "transcript_text": transcript,
+        # preprocess.py re-splits the transcript when this changes
+        "transcript_hash": content_hash(transcript)
+    }
+    return doc
+
+# Ids already completed by an interrupted run over the same playlist
+def load_progress(path):
+    try:
+        with open(path) as f:
+            progress = json.load(f)
+        if progress.get("playlist_url") == playlist_url:
+            return set(progress.get("done", []))
+    except (OSError, ValueError):
+        pass
+    return set()
+
+def save_progress(path, done):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"playlist_url": playlist_url, "done": sorted(done)}, f)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape the highlights playlist into youtube_data")
+    parser.add_argument("--incremental", action="store_true", help="only process videos not yet in youtube_data")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="videos processed in parallel")
+    parser.add_argument("--progress-file", default=PROGRESS_PATH, help="checkpoint file for resuming interrupted runs")
+    args = parser.parse_args()
+
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        playlist_info = ydl.extract_info(playlist_url, download=False)
+    video_ids = [video.get("id") for video in playlist_info.get("entries", []) if video.get("id")]
+    print(f"Found {len(video_ids)} videos in the playlist.")
+
+    # Skip videos finished by an interrupted run and, in incremental mode, those already stored
+    done = load_progress(args.progress_file)
+    skip = set(done)
+    if args.incremental:
+        skip |= {d["video_id"] for d in youtube_col.find({}, {"_id": 0, "video_id": 1})}
+    todo = [video_id for video_id in video_ids if video_id not in skip]
+    print(f"Processing {len(todo)} videos ({len(video_ids) - len(todo)} skipped).")
+
+    # Videos are submitted CHECKPOINT at a time, so an interrupted run only waits for the
+    # window in flight. Each window's upserts are written in bulk, and its videos only
+    # count as done once the flushes that wrote them reported no errors (a failed window is
+    # not recorded, so a resumed run scrapes those videos again).
+    with BulkWriter(youtube_col) as youtube_writer, ThreadPoolExecutor(max_workers=args.workers) as pool:
+        failed_writes = 0
         try:
-            video_id = video.get("id")
-            video_url = f"https://www.youtube.com/watch?v={video_id}"
-
-            # Extraer info detallada del vídeo
-            video_info = ydl.extract_info(video_url, download=False)
-
-            title = video_info.get("title")
-            publish_date = video_info.get("upload_date")  # formato YYYYMMDD
-            channel = video_info.get("channel")
-            thumbnail_url = video_info.get("thumbnail")
-
-            # Formatear fecha
-            publish_date = f"{publish_date[:4]}-{publish_date[4:6]}-{publish_date[6:]}" if publish_date else None
-
-            transcript = get_transcript(video_id)
-            thumbnail_base64 = image_to_base64_from_url(thumbnail_url)
-
-            doc = {
-                "video_id": video_id,
-                "video_url": video_url,
-                "title": title,
-                "publish_date": publish_date,
-                "channel": channel,
-                "thumbnail_base64": thumbnail_base64,
-                "transcript_text": transcript
-            }
-
-            youtube_col.update_one(
-                {"video_id": video_id},
-                {"$set": doc},
-                upsert=True
-            )
-
-            print(f"Stored video: {title}")
-
-        except Exception as e:
-            print(f"Error processing video: {e}")
+            for start in range(0, len(todo), CHECKPOINT):
+                futures = {pool.submit(fetch_video, video_id): video_id for video_id in todo[start:start + CHECKPOINT]}
+                queued = []
+                for future in as_completed(futures):
+                    video_id = futures[future]
+                    try:
+                        doc = future.result()
+                        youtube_writer.update_one({"video_id": video_id}, {"$set": doc}, upsert=True)
+                        queued.append(video_id)
+                        print(f"Stored video: {doc['title']}")
+
+                    except Exception as e:
+                        print(f"Error processing video {video_id}: {e}")
+
+                youtube_writer.flush()
+                if youtube_writer.errors == failed_writes:
+                    done.update(queued)
+                    save_progress(args.progress_file, done)
+                else:
+                    print(f"Write errors since the last checkpoint; {len(queued)} videos will be retried")
+                failed_writes = youtube_writer.errors
+        except BaseException:
+            # Interrupted: drop the queued videos instead of fetching them before exiting
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    # Finished: the next run starts from scratch, unless some writes failed
+    if youtube_writer.errors == 0:
+        if os.path.exists(args.progress_file):
+            os.remove(args.progress_file)
+    else:
+        save_progress(args.progress_file, done)
+        print(f"Some writes failed; the next run retries every video not recorded in {args.progress_file}")